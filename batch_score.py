@@ -0,0 +1,225 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rules import DEFAULT_RULES, add_rules_arguments, rules_from_args, validate_allocation
+from scoring import castle_digits, kernels
+from pool_bundle import load_pool, opponent_types
+from payoff import POOL_CSV
+
+# Candidates per task; each task holds a (batch, distinct pool) code array
+BATCH_SIZE = 256
+
+_worker_opponents = None
+
+
+# Distinct pool allocations with their per-type multiplicities, plus the code
+# contribution of every castle c holding v soldiers against each of them
+# (parts[c, v]); a candidate's codes are then one row gather and add per
+# castle instead of a full (candidates, pool, castles) comparison
+def load_opponents(pool_path=POOL_CSV, rules=DEFAULT_RULES):
+    strat_array, _, type_codes, type_names = load_pool(pool_path)
+    if strat_array.shape[1] != rules.num_castles:
+        raise ValueError(f"The pool has {strat_array.shape[1]} castles, the rules {rules.num_castles}.")
+    k = kernels(rules)
+    unique, _, onehot = opponent_types(strat_array, type_codes, len(type_names))
+    values = np.arange(rules.total_soldiers + 1)
+    parts = castle_digits(values[None, :, None], unique.T[:, None, :]).astype(k.code_dtype)
+    parts *= k.powers[:, None, None].astype(k.code_dtype)
+    return {
+        "rules": rules,
+        "unique": unique,
+        "onehot": onehot,
+        "counts": onehot.sum(axis=1),
+        "type_counts": onehot.sum(axis=0).astype(np.int64),
+        "parts": parts,
+        "type_names": [str(t) for t in type_names],
+    }
+
+
+def _init_worker(pool_path, rules):
+    global _worker_opponents
+    _worker_opponents = load_opponents(pool_path, rules)
+
+
+# Yields (name, allocation or None, error) for every data row of a CSV
+# stream. A header row is used when present (C1, C2, ... plus an optional
+# name column); otherwise the first fields are the allocation and the one
+# after them, if any, is the name.
+def read_candidates(stream, rules=DEFAULT_RULES):
+    reader = csv.reader(stream)
+    columns = rules.columns
+    alloc_cols, name_col = list(range(rules.num_castles)), rules.num_castles
+    for line, row in enumerate(reader, 1):
+        if not row or not "".join(row).strip():
+            continue
+        if line == 1 and not row[0].strip().lstrip("-").isdigit():
+            header = [h.strip() for h in row]
+            if all(c in header for c in columns):
+                alloc_cols = [header.index(c) for c in columns]
+                name_col = header.index("name") if "name" in header else None
+            continue
+        name = row[name_col].strip() if name_col is not None and name_col < len(row) else f"row_{line}"
+        try:
+            fields = [row[c] for c in alloc_cols if c < len(row) and row[c].strip()]
+            values = [int(v) for v in fields]
+        except ValueError:
+            yield name, None, "not all values are integers"
+            continue
+        error = validate_allocation(values, rules)
+        yield name, None if error else values, error
+
+
+def batches(candidates, batch_size=BATCH_SIZE):
+    batch = []
+    for candidate in candidates:
+        batch.append(candidate)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def score_candidates(candidates, opponents):
+    candidates = np.asarray(candidates)
+    parts, onehot, counts = opponents["parts"], opponents["onehot"], opponents["counts"]
+    codes = parts[0][candidates[:, 0]].astype(np.int32)
+    for c in range(1, len(parts)):
+        codes += parts[c][candidates[:, c]]
+    margin = kernels(opponents["rules"]).margin_table.take(codes)
+    # float64 keeps the counts exact however many entries share a type; losses
+    # are whatever is left of each type's total
+    wins = ((margin > 0).astype(np.float64) @ onehot).astype(np.int64)
+    draws = ((margin == 0).astype(np.float64) @ onehot).astype(np.int64)
+    by_type = np.stack([wins, draws, opponents["type_counts"] - wins - draws], axis=-1)
+    mean_margin = (margin.astype(np.float64) @ counts) / counts.sum()
+    return by_type, mean_margin
+
+
+def _score_batch(batch, opponents=None):
+    opponents = opponents if opponents is not None else _worker_opponents
+    valid = [i for i, (_, alloc, _) in enumerate(batch) if alloc is not None]
+    by_type = mean_margin = None
+    if valid:
+        by_type, mean_margin = score_candidates([batch[i][1] for i in valid], opponents)
+    results = []
+    for name, alloc, error in batch:
+        results.append({"name": name, "allocation": alloc, "error": error})
+    for k, i in enumerate(valid):
+        results[i]["by_type"] = by_type[k]
+        results[i]["mean_margin"] = float(mean_margin[k])
+    return results
+
+
+def score_stream(candidates, pool_path=POOL_CSV, batch_size=BATCH_SIZE, workers=1, rules=DEFAULT_RULES):
+    if workers <= 1:
+        opponents = load_opponents(pool_path, rules)
+        for batch in batches(candidates, batch_size):
+            yield _score_batch(batch, opponents)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pool_path, rules)) as executor:
+        # Bounded window of batches in flight, yielded in input order
+        pending = deque()
+        for batch in batches(candidates, batch_size):
+            pending.append(executor.submit(_score_batch, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _record(result, type_names, by_type):
+    record = {"name": result["name"]}
+    if result["error"]:
+        record["error"] = result["error"]
+        return record
+    counts = result["by_type"]
+    wins, draws, losses = (int(v) for v in counts.sum(axis=0))
+    record.update({
+        "allocation": ",".join(map(str, result["allocation"])),
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "win_rate": round(wins / (wins + draws + losses), 6),
+        "mean_margin": round(result["mean_margin"], 4),
+    })
+    if by_type:
+        record["by_type"] = {
+            t: {"wins": int(w), "draws": int(d), "losses": int(l)} for t, (w, d, l) in zip(type_names, counts)
+        }
+    return record
+
+
+class _CsvOutput:
+    def __init__(self, stream, type_names, by_type):
+        fields = ["name", "allocation", "wins", "draws", "losses", "win_rate", "mean_margin"]
+        if by_type:
+            fields += [f"{r}[{t}]" for t in type_names for r in ("wins", "draws", "losses")]
+        self.writer = csv.DictWriter(stream, fields + ["error"])
+        self.writer.writeheader()
+
+    def write(self, record):
+        for t, counts in record.pop("by_type", {}).items():
+            for r, v in counts.items():
+                record[f"{r}[{t}]"] = v
+        self.writer.writerow(record)
+
+
+class _JsonlOutput:
+    def __init__(self, stream, type_names, by_type):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score candidate strategies against a strategy pool.")
+    parser.add_argument("input", nargs="?", default="-", help="candidates CSV, or - for stdin")
+    parser.add_argument("--pool", default=POOL_CSV, help="strategy pool CSV")
+    parser.add_argument("--out", default="-", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None,
+                        help="output format (default: from the --out extension, else csv)")
+    parser.add_argument("--by-type", action="store_true", help="add wins/draws/losses per opponent type")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="candidates per task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    add_rules_arguments(parser)
+    args = parser.parse_args()
+
+    rules = rules_from_args(args)
+    strat_array, _, _, type_names = load_pool(args.pool)
+    if strat_array.shape[1] != rules.num_castles:
+        parser.error(f"{args.pool} has {strat_array.shape[1]} castles; pass the rules it was generated with")
+    type_names = [str(t) for t in type_names]
+    fmt = args.format or ("jsonl" if args.out.endswith((".jsonl", ".json")) else "csv")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="")
+    sink = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+    output = (_JsonlOutput if fmt == "jsonl" else _CsvOutput)(sink, type_names, args.by_type)
+
+    started = time.perf_counter()
+    scored = 0
+    try:
+        for results in score_stream(read_candidates(source, rules), args.pool, args.batch_size, args.workers, rules):
+            for result in results:
+                output.write(_record(result, type_names, args.by_type))
+            sink.flush()
+            scored += len(results)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - started
+    print(f"Scored {scored:,} candidates in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
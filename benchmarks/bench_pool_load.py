@@ -0,0 +1,60 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each load runs in a fresh interpreter so imports and page cache effects of a
+# real cold start are included
+CSV_LOAD = """
+import time
+t = time.perf_counter()
+from pool_bundle import read_pool_csv
+pool = read_pool_csv({csv!r})
+print(time.perf_counter() - t, pool[0].nbytes)
+"""
+
+BUNDLE_LOAD = """
+import time
+t = time.perf_counter()
+from pool_bundle import read_pool_bundle, bundle_path, file_digest
+pool = read_pool_bundle(bundle_path({csv!r}), file_digest({csv!r}))
+print(time.perf_counter() - t, pool[0].nbytes)
+"""
+
+
+def cold_load(snippet, csv, repeats):
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", snippet.format(csv=csv)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.split()
+        times.append(float(out[0]))
+    return statistics.median(times), int(out[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold pool load from CSV and from the binary bundle.")
+    parser.add_argument("--pool", default="strategy_pool_full_min2.csv")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from pool_bundle import read_pool_csv, write_pool_bundle, bundle_path, file_digest
+
+    csv = os.path.join(ROOT, args.pool)
+    strat_array, names, type_codes, type_names = read_pool_csv(csv)
+    write_pool_bundle(strat_array, names, type_names[type_codes], bundle_path(csv), file_digest(csv))
+
+    csv_time, csv_bytes = cold_load(CSV_LOAD, csv, args.repeats)
+    bundle_time, bundle_bytes = cold_load(BUNDLE_LOAD, csv, args.repeats)
+    print(f"CSV:    {csv_time * 1e3:8.1f} ms  allocations {csv_bytes:>9,} bytes")
+    print(f"Bundle: {bundle_time * 1e3:8.1f} ms  allocations {bundle_bytes:>9,} bytes")
+    print(f"Speedup: {csv_time / bundle_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
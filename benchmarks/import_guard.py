@@ -0,0 +1,72 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay out of each entry point's import graph, and a
+# generous ceiling on its cumulative import time in a fresh interpreter
+IMPORT_RULES = {
+    "metrics": {"forbidden": ["numpy", "pandas", "streamlit"], "max_ms": 100},
+    "pool_cache": {"forbidden": ["numpy", "pandas", "streamlit"], "max_ms": 100},
+    "rules": {"forbidden": ["numpy", "pandas", "streamlit"], "max_ms": 100},
+    "scoring": {"forbidden": ["pandas", "streamlit", "matplotlib"], "max_ms": 600},
+    "charts": {"forbidden": ["matplotlib", "seaborn", "pandas"], "max_ms": 600},
+    "match_utils": {"forbidden": ["matplotlib", "seaborn", "pandas"], "max_ms": 2500},
+    "tournament_page": {"forbidden": ["matplotlib", "seaborn"], "max_ms": 4000},
+}
+
+
+# Parses `python -X importtime` output into {module: cumulative microseconds}
+# for `module` and everything imported beneath it (interpreter start-up
+# imports such as site are left out)
+def import_profile(module):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        entries.append((name.strip(), int(cumulative), depth))
+
+    # Children are printed before their parent, one indent level deeper
+    end = max(i for i, (name, _, depth) in enumerate(entries) if name == module)
+    start = end
+    while start > 0 and entries[start - 1][2] > entries[end][2]:
+        start -= 1
+    return {name: cumulative for name, cumulative, _ in entries[start:end + 1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when app modules start importing heavy dependencies eagerly.")
+    parser.add_argument("--repeats", type=int, default=3, help="best-of runs for the timing check")
+    parser.add_argument("--no-timing", action="store_true", help="only check the import graph")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to show per module")
+    args = parser.parse_args()
+
+    failures = []
+    for module, rule in IMPORT_RULES.items():
+        profiles = [import_profile(module) for _ in range(args.repeats)]
+        profile = min(profiles, key=lambda p: p[module])
+        total_ms = profile[module] / 1000
+        leaked = [name for name in rule["forbidden"] if name in profile]
+        print(f"{module:<16} {total_ms:8.1f} ms")
+        for name, cumulative in sorted(profile.items(), key=lambda kv: -kv[1])[1:args.top + 1]:
+            print(f"    {name:<40} {cumulative / 1000:8.1f} ms")
+        if leaked:
+            failures.append(f"{module} imports {', '.join(leaked)} at import time")
+        if not args.no_timing and total_ms > rule["max_ms"]:
+            failures.append(f"{module} took {total_ms:.0f} ms to import (limit {rule['max_ms']} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HOST = "127.0.0.1"
+PORT = 8765
+CONCURRENCY = [1, 4, 16, 64]
+DURATION = 5.0
+
+
+def _payloads(endpoint, n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    strategies = rng.multinomial(100, [0.1] * 10, size=(n, 2)).tolist()
+    if endpoint == "score":
+        return [json.dumps({"strategy": s1}).encode() for s1, _ in strategies]
+    return [json.dumps({"s1": s1, "s2": s2}).encode() for s1, s2 in strategies]
+
+
+async def _request(reader, writer, method, path, body=b""):
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def _get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, body = await _request(reader, writer, "GET", path)
+    finally:
+        writer.close()
+    return json.loads(body) if status == 200 else None
+
+
+# One keep-alive connection sending requests back to back until `stop`
+async def _client(host, port, path, payloads, offset, stop, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            status, _ = await _request(reader, writer, "POST", path, payloads[i % len(payloads)])
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, endpoint, concurrency, duration, payloads):
+    before = await _get(host, port, "/health")
+    latencies, errors = [], []
+    started = time.perf_counter()
+    stop = started + duration
+    await asyncio.gather(*(
+        _client(host, port, f"/{endpoint}", payloads, k * 97, stop, latencies, errors)
+        for k in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    after = await _get(host, port, "/health")
+    batches = after["batches"] - before["batches"]
+    latencies = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else float("nan"),
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else float("nan"),
+        "mean_batch": (after["requests"] - before["requests"]) / batches if batches else 0,
+    }
+
+
+async def _wait_ready(host, port, timeout):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            return await _get(host, port, "/health")
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"No scoring service on {host}:{port}.")
+            await asyncio.sleep(0.2)
+
+
+async def load_test(args):
+    await _wait_ready(args.host, args.port, args.startup_timeout)
+    payloads = _payloads(args.endpoint)
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(args.host, args.port, args.endpoint, concurrency, args.duration, payloads)
+        results.append(result)
+        print(f"{result['concurrency']:>8} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.0f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['mean_batch']:>6.1f}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the scoring service on localhost.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--endpoint", choices=["score", "match"], default="score")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY, help="client counts to try")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per concurrency level")
+    parser.add_argument("--spawn", action="store_true", help="start scoring_service.py for the run")
+    parser.add_argument("--window-ms", type=float, default=None, help="batch window for the spawned service")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    service = None
+    if args.spawn:
+        command = [sys.executable, "scoring_service.py", "--host", args.host, "--port", str(args.port)]
+        if args.window_ms is not None:
+            command += ["--window-ms", str(args.window_ms)]
+        service = subprocess.Popen(command, cwd=ROOT)
+    try:
+        asyncio.run(load_test(args))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == "__main__":
+    main()
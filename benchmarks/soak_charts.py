@@ -0,0 +1,79 @@
+import argparse
+import logging
+import os
+import resource
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    # Current resident set size where /proc is available, peak otherwise
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# The pre-cache rendering: a pyplot figure per call that is never closed
+def _pyplot_chart(s1, s2):
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    x = np.arange(len(s1))
+    ax.bar(x, s1, 0.35, color='blue')
+    ax.bar(x + 0.35, s2, 0.35, color='red')
+    fig.savefig(os.devnull, format="png")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many matches headlessly and watch resident memory.")
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=30, help="tournament size for the heatmap")
+    parser.add_argument("--heatmap-every", type=int, default=10, help="matches between heatmap renders")
+    parser.add_argument("--warmup", type=int, default=100, help="matches before the baseline is taken")
+    parser.add_argument("--max-growth-mb", type=float, default=20.0)
+    parser.add_argument("--pyplot", action="store_true", help="use the old unclosed pyplot figures for comparison")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    # Streamlit calls outside `streamlit run` only log warnings
+    logging.disable(logging.WARNING)
+    import matplotlib
+    matplotlib.use("Agg")
+    import numpy as np
+    from match_utils import play_full_match
+    from charts import outcome_heatmap
+    from tournament_state import Scoreboard
+
+    rng = np.random.default_rng(0)
+    names = [f"P{i}" for i in range(args.players)]
+    board = Scoreboard()
+    baseline = None
+    for n in range(1, args.matches + 1):
+        s1, s2 = rng.multinomial(100, np.full(10, 0.1), size=2)
+        i, j = rng.choice(args.players, 2, replace=False)
+        if args.pyplot:
+            _pyplot_chart(s1, s2)
+            score1, score2 = 0, 0
+        else:
+            score1, score2 = play_full_match(s1, s2, names[i], names[j], animate=False)
+        board.add_match({"Player 1": names[i], "Player 2": names[j], "Score 1": score1, "Score 2": score2})
+        if n % args.heatmap_every == 0:
+            outcome_heatmap(board.outcome_matrix(names), names)
+
+        if n == args.warmup:
+            baseline = rss_mb()
+        if n % 100 == 0:
+            print(f"{n:>6} matches  rss {rss_mb():7.1f} MB", flush=True)
+
+    growth = rss_mb() - (baseline if baseline is not None else 0)
+    print(f"Growth after warm-up: {growth:.1f} MB")
+    if growth > args.max_growth_mb:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HISTORY_FILE = os.path.join(ROOT, "benchmarks", "results", "history.json")
+POOL_CSV = os.path.join(ROOT, "strategy_pool_full_min2.csv")
+MIN_TIME = 0.5
+MAX_REPEATS = 200
+THRESHOLD = 0.10
+
+# name -> setup function returning the callable to time. Setup work (pool
+# loading, building inputs) is not part of the measurement.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _rng():
+    import numpy as np
+    return np.random.default_rng(0)
+
+
+def _pool():
+    from pool_bundle import load_pool
+    return load_pool(POOL_CSV)[0]
+
+
+@benchmark("scoring.score_vs_pool")
+def _score_vs_pool():
+    import numpy as np
+    from scoring import score
+    pool = _pool()
+    strategy = np.full(10, 10)
+    return lambda: score(strategy, pool)
+
+
+@benchmark("scoring.score_vs_unique_pool")
+def _score_vs_unique_pool():
+    import numpy as np
+    from scoring import score, tally
+    from pool_bundle import deduplicate
+    unique, counts, _ = deduplicate(_pool())
+    strategy = np.full(10, 10)
+    return lambda: tally(*score(strategy, unique), counts)
+
+
+# The same pool of random strategies scored under the standard rules and a
+# 12-castle variant, whose outcome tables are 9x larger
+def _variant_benchmark(name, rules_factory):
+    @benchmark(f"scoring.score_variant.{name}[10000]")
+    def setup():
+        from scoring import kernels, score
+        rules = rules_factory()
+        pool = _rng().multinomial(rules.total_soldiers, [1 / rules.num_castles] * rules.num_castles, size=10_000)
+        strategy = pool[0]
+        kernels(rules)
+        return lambda: score(strategy, pool, rules)
+
+
+def _register_variants():
+    from rules import DEFAULT_RULES, VARIANTS
+    _variant_benchmark("standard", lambda: DEFAULT_RULES)
+    _variant_benchmark("12_castles_4_strike", lambda: VARIANTS["12 castles, 4-strike rule"])
+
+
+# Table build for a 12-castle ruleset, which the app pays once per process
+@benchmark("scoring.build_kernels[12]")
+def _build_kernels():
+    from rules import make_rules
+    from scoring import Kernels
+    rules = make_rules(12, streak_length=4)
+    return lambda: Kernels(rules)
+
+
+@benchmark("pool.normalize_allocation_with_min")
+def _normalize_one():
+    from pool import normalize_allocation_with_min
+    weights = _rng().random(10)
+    return lambda: normalize_allocation_with_min(weights)
+
+
+@benchmark("pool.normalize_allocations_with_min[10000]")
+def _normalize_many():
+    from pool import normalize_allocations_with_min
+    weights = _rng().random((10_000, 10))
+    return lambda: normalize_allocations_with_min(weights)
+
+
+def _generator_benchmark(name, generate, n=1000):
+    @benchmark(f"pool.generate.{name}[{n}]")
+    def setup():
+        rng = _rng()
+        return lambda: generate(n, rng)
+
+
+def _register_generators():
+    import pool
+    for name, generate in pool.all_generators.items():
+        _generator_benchmark(name, generate)
+    _generator_benchmark("random", pool.generate_random_named_strats)
+
+
+# A fresh interpreter per call, so the import and file reads of a real
+# server start are included
+@benchmark("pool.load_cold")
+def _load_cold():
+    snippet = f"import pool_cache; pool_cache.get_pool({POOL_CSV!r})"
+    return lambda: subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, check=True)
+
+
+@benchmark("pool.load_warm")
+def _load_warm():
+    from pool_bundle import load_pool, load_pool_dedup
+    load_pool(POOL_CSV)
+
+    def load():
+        strat_array = load_pool(POOL_CSV)[0]
+        load_pool_dedup(POOL_CSV, strat_array)
+    return load
+
+
+@benchmark("pool.get_pool_cached")
+def _get_pool_cached():
+    import pool_cache
+    pool_cache.get_pool(POOL_CSV)
+    return lambda: pool_cache.get_pool(POOL_CSV)
+
+
+# Stands in for the streamlit module: every element call is accepted and
+# returns a no-op context manager, so page code runs without a server
+class _StreamlitStub:
+    def __init__(self):
+        self.session_state = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+
+# play_full_match without animation, as the tournament and practice pages
+# call it: trace, match log, final score and the allocation chart (rendered
+# afresh, not from the chart cache), with Streamlit stubbed out
+def _play_match_benchmark(num_matches, render_charts):
+    name = "match.play_full_match" + ("" if render_charts else "_cached_chart")
+
+    @benchmark(f"{name}[{num_matches}]")
+    def setup():
+        import charts
+        import match_utils
+        match_utils.st = _StreamlitStub()
+        pairs = _rng().multinomial(100, [0.1] * 10, size=(num_matches, 2))
+
+        def play():
+            if render_charts:
+                charts._cache.clear()
+            for s1, s2 in pairs:
+                match_utils.play_full_match(s1, s2, "P1", "P2", animate=False)
+        return play
+
+
+_play_match_benchmark(3, render_charts=True)
+_play_match_benchmark(100, render_charts=False)
+
+
+def _round_robin_matches(num_players):
+    import numpy as np
+    rng = _rng()
+    names = [f"P{i}" for i in range(num_players)]
+    i, j = np.triu_indices(num_players, k=1)
+    scores = rng.integers(0, 56, size=(len(i), 2))
+    matches = [
+        {"Player 1": names[a], "Player 2": names[b], "Score 1": int(s[0]), "Score 2": int(s[1])}
+        for a, b, s in zip(i, j, scores)
+    ]
+    return names, matches
+
+
+def _aggregation_benchmark(num_players):
+    @benchmark(f"tournament.scoreboard[{num_players}]")
+    def scoreboard():
+        from tournament_state import Scoreboard
+        names, matches = _round_robin_matches(num_players)
+
+        def aggregate():
+            board = Scoreboard()
+            board.add_matches(matches)
+            board.totals(names)
+            board.outcome_matrix(names)
+        return aggregate
+
+    @benchmark(f"tournament.add_remove_match[{num_players}]")
+    def add_remove():
+        from tournament_state import Scoreboard
+        names, matches = _round_robin_matches(num_players)
+        board = Scoreboard()
+        board.add_matches(matches)
+
+        def update():
+            board.remove_match(matches[0])
+            board.add_match(matches[0])
+        return update
+
+    @benchmark(f"tournament.heatmap[{num_players}]")
+    def heatmap():
+        import charts
+        from tournament_state import Scoreboard
+        names, matches = _round_robin_matches(num_players)
+        board = Scoreboard()
+        board.add_matches(matches)
+        outcome = board.outcome_matrix(names)
+
+        def render():
+            # Measure rendering, not the chart cache
+            charts._cache.clear()
+            charts.outcome_heatmap(outcome, names)
+        return render
+
+
+def _register_aggregation():
+    for num_players in (10, 100, 1000):
+        _aggregation_benchmark(num_players)
+    for snapshot in (True, False):
+        _restore_benchmark(100, snapshot)
+
+
+# Opening a stored Round 2 tournament with every pair played (with all
+# nine pairings per match), from a snapshot or by replaying the whole log
+def _restore_benchmark(num_players, snapshot):
+    kind = "snapshot" if snapshot else "replay"
+
+    @benchmark(f"tournament.restore_{kind}[{num_players}]")
+    def restore():
+        import tempfile
+        from round_robin import score_round_robin
+        from tournament_store import TournamentStore
+        rng = _rng()
+        players = {f"P{i}": rng.multinomial(100, [0.1] * 10, size=3).tolist() for i in range(num_players)}
+        path = os.path.join(tempfile.mkdtemp(), "tournament.sqlite")
+        store = TournamentStore("bench", path, snapshot_every=1 if snapshot else 10 ** 9)
+        for name, strategies in players.items():
+            store.add_player(name, strategies)
+        store.replace_matches(2, lambda m: m.get("Auto"), score_round_robin(players, 3))
+        store.close()
+        return lambda: TournamentStore("bench", path, snapshot_every=10 ** 9).close()
+
+
+# Pairing round 8 of a 10,000-player Swiss tournament drawn from the pool
+@benchmark("swiss.pair_round[10000]")
+def _swiss_pair_round():
+    from swiss import pair_round, simulate_swiss
+    pool = _pool()
+    strategies = pool[_rng().integers(len(pool), size=(10_000, 1))]
+    result = simulate_swiss(strategies, rounds=7, seed=0)
+    args = (result["wins"], result["points"], result["opponents"], result["had_bye"])
+    return lambda: pair_round(*args, _rng())
+
+
+def measure(fn, min_time=MIN_TIME, max_repeats=MAX_REPEATS):
+    fn()
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_repeats and (len(times) < 3 or time.perf_counter() - started < min_time):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {"min": min(times), "median": statistics.median(times), "repeats": len(times)}
+
+
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(selected=None, min_time=MIN_TIME, path=HISTORY_FILE, label=None):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        results[name] = measure(setup(), min_time)
+        print(f"{name:<52} {results[name]['min'] * 1e3:10.3f} ms  (x{results[name]['repeats']})", flush=True)
+
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "label": label,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    history = load_history(path)
+    history.append(entry)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp, path)
+    return entry
+
+
+def _find(history, ref):
+    # A commit or label first (short hashes can be all digits), then an
+    # index into the history such as -1 for the latest run
+    matches = [e for e in history if ref in (e.get("commit"), e.get("label"))]
+    if matches:
+        return matches[-1]
+    try:
+        return history[int(ref)]
+    except (ValueError, IndexError):
+        raise SystemExit(f"No history entry for {ref!r}.")
+
+
+# Compares best times; ratios above 1 + threshold are regressions
+def compare(base, head, threshold=THRESHOLD):
+    regressions = []
+    for name in sorted(set(base["results"]) & set(head["results"])):
+        before, after = base["results"][name]["min"], head["results"][name]["min"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = "faster"
+        print(f"{name:<52} {before * 1e3:10.3f} -> {after * 1e3:10.3f} ms  {ratio:6.2f}x  {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite or compare two runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="run benchmarks and append them to the history")
+    run_parser.add_argument("-k", action="append", default=None, help="only benchmarks whose name contains this")
+    run_parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds to spend per benchmark")
+    run_parser.add_argument("--label", default=None, help="name for this run in the history")
+    run_parser.add_argument("--history", default=HISTORY_FILE)
+    compare_parser = sub.add_parser("compare", help="flag regressions between two runs")
+    compare_parser.add_argument("base", nargs="?", default="-2", help="history index, commit or label (default: previous run)")
+    compare_parser.add_argument("head", nargs="?", default="-1", help="history index, commit or label (default: latest run)")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, e.g. 0.1 for 10%%")
+    compare_parser.add_argument("--history", default=HISTORY_FILE)
+    sub.add_parser("list", help="list benchmark names")
+    args = parser.parse_args()
+
+    _register_generators()
+    _register_aggregation()
+    _register_variants()
+
+    if args.command == "list":
+        print("\n".join(BENCHMARKS))
+    elif args.command == "run":
+        run(args.k, args.min_time, args.history, args.label)
+    else:
+        history = load_history(args.history)
+        if len(history) < 2 and (args.base, args.head) == ("-2", "-1"):
+            raise SystemExit("Need at least two runs in the history to compare.")
+        regressions = compare(_find(history, args.base), _find(history, args.head), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+CHART_CACHE_ENTRIES = 256
+# Above this many players the heatmap is drawn straight from the matrix as
+# an image instead of through matplotlib
+HEATMAP_MAX_PLAYERS = 40
+HEATMAP_CELL_PIXELS = 4
+# Loss, draw / not played, win
+OUTCOME_COLORS = ["#ff9999", "#ffffff", "#99ff99"]
+DIAGONAL_COLOR = "#dddddd"
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+# Rendered PNG bytes keyed by the chart's inputs, shared by every session
+def _cached(key, render):
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    png = render()
+    with _lock:
+        _cache[key] = png
+        while len(_cache) > CHART_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return png
+
+
+# matplotlib is imported on first render, not when a page imports this module.
+# Figures are built with the object API rather than pyplot, so nothing keeps
+# a reference to them once the PNG is written.
+def _figure(figsize):
+    from matplotlib.figure import Figure
+
+    return Figure(figsize=figsize)
+
+
+def _to_png(fig):
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+def allocation_chart(s1, s2, p1="Player 1", p2="Player 2"):
+    s1 = tuple(int(v) for v in s1)
+    s2 = tuple(int(v) for v in s2)
+
+    def render():
+        fig = _figure((10, 4))
+        ax = fig.subplots()
+        x = np.arange(len(s1))
+        width = 0.35
+        ax.bar(x, s1, width, label=p1, color='blue')
+        ax.bar(x + width, s2, width, label=p2, color='red')
+        ax.set_xticks(x + width / 2)
+        ax.set_xticklabels([f"C{i+1}" for i in range(len(s1))])
+        ax.set_ylabel("Soldiers")
+        ax.set_title(f"Allocation: {p1} vs {p2}")
+        ax.legend()
+        return _to_png(fig)
+
+    return _cached(("allocation", s1, s2, p1, p2), render)
+
+
+def _heatmap_figure(outcome_matrix, names):
+    import matplotlib.colors as mcolors
+    import seaborn as sns
+
+    cmap = mcolors.ListedColormap(OUTCOME_COLORS)
+    norm = mcolors.BoundaryNorm([-1.5, -0.5, 0.5, 1.5], cmap.N)
+    fig = _figure((6, 6))
+    ax = fig.subplots()
+    sns.heatmap(
+        outcome_matrix,
+        cmap=cmap,
+        norm=norm,
+        cbar=False,
+        xticklabels=names,
+        yticklabels=names,
+        linewidths=0.5,
+        linecolor='gray',
+        square=True,
+        annot=False,
+        ax=ax
+    )
+    ax.set_xlabel("Opponent")
+    ax.set_ylabel("Player")
+    return _to_png(fig)
+
+
+# One block of pixels per cell, coloured by table lookup; no plotting library
+def _heatmap_pixels(outcome_matrix):
+    palette = np.array([
+        [int(c[k:k + 2], 16) for k in (1, 3, 5)] for c in OUTCOME_COLORS + [DIAGONAL_COLOR]
+    ], dtype=np.uint8)
+    index = np.where(np.isnan(outcome_matrix), 3, np.nan_to_num(outcome_matrix) + 1).astype(np.intp)
+    image = palette[index]
+    return np.repeat(np.repeat(image, HEATMAP_CELL_PIXELS, axis=0), HEATMAP_CELL_PIXELS, axis=1)
+
+
+# Returns PNG bytes for small tournaments and an RGB array for large ones;
+# both can be passed to st.image
+def outcome_heatmap(outcome_matrix, names):
+    outcome_matrix = np.asarray(outcome_matrix, dtype=np.float64)
+    if len(names) > HEATMAP_MAX_PLAYERS:
+        return _heatmap_pixels(outcome_matrix)
+    digest = hashlib.sha1(outcome_matrix.tobytes()).hexdigest()
+    return _cached(("heatmap", digest, tuple(names)), lambda: _heatmap_figure(outcome_matrix, names))
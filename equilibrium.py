@@ -0,0 +1,183 @@
+import argparse
+import time
+
+import numpy as np
+
+from rules import DEFAULT_RULES
+from scoring import outcome_codes, kernels
+from optimizer import search_best_response
+from pool_bundle import deduplicate
+
+USER_NAME = "Your strategy"
+USER_TYPE = "user"
+
+
+# Payoff (+1 win, 0 draw, -1 loss) of every pool row against one opponent.
+# The game is symmetric and zero-sum, so this column of the payoff matrix is
+# also minus the opponent's row.
+def payoff_column(pool, opponent, rules=DEFAULT_RULES):
+    return kernels(rules).result_table.take(outcome_codes(pool, opponent, rules)).astype(np.int32)
+
+
+def _with_user(strat_array, user_strategy):
+    if user_strategy is None:
+        return np.asarray(strat_array)
+    return np.vstack([strat_array, np.asarray(user_strategy, dtype=np.asarray(strat_array).dtype)])
+
+
+# Fictitious play over the distinct allocations: each iteration adds the best
+# response to the empirical mixture of earlier best responses. Only the
+# columns of those best responses are ever scored, so memory stays O(N).
+# The value of the symmetric game is 0, so the exploitability of a mixture x
+# is simply max_i (A x)_i.
+def fictitious_play(strat_array, iterations=2000, user_strategy=None, start=None,
+                    log_every=10, progress=None, rules=DEFAULT_RULES):
+    pool = _with_user(strat_array, user_strategy)
+    unique, counts, inverse = deduplicate(pool)
+    cumulative = np.zeros(len(unique), dtype=np.int64)
+    played = np.zeros(len(unique), dtype=np.int64)
+    columns = {}
+    history = []
+    started = time.perf_counter()
+
+    response = int(np.argmax(counts)) if start is None else int(inverse[start])
+    for t in range(1, iterations + 1):
+        if response not in columns:
+            columns[response] = payoff_column(unique, unique[response], rules)
+        cumulative += columns[response]
+        played[response] += 1
+
+        response = int(np.argmax(cumulative))
+        if t % log_every == 0 or t == iterations:
+            history.append({
+                "iteration": t,
+                "exploitability": float(cumulative[response] / t),
+                "support": int(np.count_nonzero(played)),
+                "seconds": time.perf_counter() - started,
+            })
+            if progress is not None:
+                progress(t / iterations)
+
+    return {
+        "unique": unique,
+        "inverse": inverse,
+        "weights": played / iterations,
+        "plays": played,
+        "payoffs": cumulative / iterations,
+        "best_response": response,
+        "history": history,
+        "user_index": int(inverse[-1]) if user_strategy is not None else None,
+        "seconds": time.perf_counter() - started,
+        "rules": rules,
+    }
+
+
+# Expected payoff of every row type against every column type, from the
+# win/draw/loss totals in a payoff.py type matrix
+def type_payoff_matrix(type_matrix):
+    counts = type_matrix.pivot(index="type", columns="opponent_type", values=["wins", "draws", "losses"])
+    type_names = counts["wins"].index.to_numpy()
+    wins = counts["wins"].to_numpy(dtype=float)
+    total = wins + counts["draws"].to_numpy(dtype=float) + counts["losses"].to_numpy(dtype=float)
+    matrix = (wins - counts["losses"].to_numpy(dtype=float)) / np.maximum(total, 1)
+    return matrix, type_names
+
+
+# Adds the user's strategy as its own one-member family; its row comes from a
+# single batched scoring pass against the pool
+def add_user_type(matrix, type_names, strat_array, type_codes, user_strategy, rules=DEFAULT_RULES):
+    column = payoff_column(np.asarray(strat_array), np.asarray(user_strategy), rules)
+    sizes = np.bincount(type_codes, minlength=len(type_names))
+    user_row = -np.bincount(type_codes, weights=column, minlength=len(type_names)) / np.maximum(sizes, 1)
+    matrix = np.block([[matrix, -user_row[:, None]], [user_row[None, :], np.zeros((1, 1))]])
+    return matrix, np.append(type_names, USER_TYPE)
+
+
+# Discrete-time replicator dynamics on the type meta-game. Replicator paths
+# cycle around the equilibrium of a zero-sum game, so the reported weights are
+# the time average of the trajectory.
+def replicator_dynamics(matrix, iterations=5000, step=0.5, log_every=10):
+    num_types = len(matrix)
+    x = np.full(num_types, 1 / num_types)
+    average = np.zeros(num_types)
+    history = []
+    for t in range(1, iterations + 1):
+        fitness = matrix @ x
+        x = x * np.exp(step * (fitness - x @ fitness))
+        x /= x.sum()
+        average += (x - average) / t
+        if t % log_every == 0 or t == iterations:
+            payoffs = matrix @ average
+            history.append({"iteration": t, "exploitability": float(payoffs.max() - average @ payoffs)})
+    payoffs = matrix @ average
+    return {
+        "weights": average,
+        "payoffs": payoffs,
+        "best_response": int(np.argmax(payoffs)),
+        "history": history,
+    }
+
+
+# Best allocation anywhere, not just in the pool, against the equilibrium
+# mixture; the fictitious-play play counts are integer weights
+def search_mixture_response(result, iterations=200_000, seed=None):
+    support = np.flatnonzero(result["plays"])
+    return search_best_response(
+        result["unique"][support], iterations=iterations, seed=seed, weights=result["plays"][support],
+        rules=result["rules"]
+    )
+
+
+def main():
+    from payoff import read_pool, load_summaries, compute_payoffs, POOL_CSV, OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="Solve the pool meta-game for a stable strategy mixture.")
+    parser.add_argument("--pool", default=POOL_CSV, help="strategy pool CSV")
+    parser.add_argument("--by-type", action="store_true", help="replicator dynamics over type families")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--user", default=None, help="your strategy, 10 comma-separated integers")
+    parser.add_argument("--search", type=int, default=0,
+                        help="also anneal this many candidates for a best response outside the pool")
+    parser.add_argument("--top", type=int, default=15, help="mixture entries to print")
+    args = parser.parse_args()
+
+    strat_array, names, type_codes, type_names = read_pool(args.pool)
+    user = [int(x) for x in args.user.split(",")] if args.user else None
+
+    if args.by_type:
+        _, type_matrix = load_summaries(OUTPUT_DIR)
+        if type_matrix is None:
+            _, type_matrix = compute_payoffs(args.pool, OUTPUT_DIR)
+        matrix, labels = type_payoff_matrix(type_matrix)
+        if user is not None:
+            matrix, labels = add_user_type(matrix, labels, strat_array, type_codes, user)
+        result = replicator_dynamics(matrix, args.iterations)
+        order = np.argsort(-result["weights"])[:args.top]
+        for i in order:
+            print(f"{labels[i]:<28} weight={result['weights'][i]:.4f}  payoff={result['payoffs'][i]:+.4f}")
+        print(f"Exploitability: {result['history'][-1]['exploitability']:.4f}")
+        print(f"Best response type: {labels[result['best_response']]}")
+        return
+
+    result = fictitious_play(strat_array, args.iterations, user_strategy=user)
+    names = np.append(names, USER_NAME) if user is not None else names
+    for u in np.argsort(-result["weights"])[:args.top]:
+        if result["weights"][u] == 0:
+            break
+        members = names[result["inverse"] == u]
+        label = members[0] + (f" (+{len(members) - 1})" if len(members) > 1 else "")
+        print(f"{','.join(map(str, result['unique'][u])):<32} weight={result['weights'][u]:.4f}  {label}")
+    print(f"Exploitability: {result['history'][-1]['exploitability']:.4f} after {args.iterations} "
+          f"iterations in {result['seconds']:.1f}s")
+    print(f"Best pool response: {','.join(map(str, result['unique'][result['best_response']]))}")
+    if result["user_index"] is not None:
+        u = result["user_index"]
+        print(f"Your strategy: weight={result['weights'][u]:.4f}  payoff vs mixture={result['payoffs'][u]:+.4f}")
+    if args.search:
+        best = search_mixture_response(result, args.search)["best"][0]
+        print(f"Best allocation found: {','.join(map(str, best['allocation']))}  "
+              f"wins={best['wins']} draws={best['draws']} losses={best['losses']} (weighted by plays)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from rules import DEFAULT_RULES
+from scoring import kernels
+
+CACHE_DB = "eval_cache.sqlite"
+MEMORY_ENTRIES = 256
+# Bumped whenever the meaning of the stored arrays changes
+CACHE_VERSION = 3
+
+
+# Smallest unsigned dtype that holds every score of the ruleset (uint8 for
+# the standard game, whose scores never exceed 55)
+def _score_dtype(rules):
+    top = int(kernels(rules).outcome_table.max())
+    return next(dtype for dtype in (np.uint8, np.uint16, np.uint32) if top <= np.iinfo(dtype).max)
+
+
+def _pack(you, them, dtype=np.uint8):
+    return zlib.compress(np.stack([you, them]).astype(dtype).tobytes())
+
+
+def _unpack(blob, dtype=np.uint8):
+    scores = np.frombuffer(zlib.decompress(blob), dtype=dtype).reshape(2, -1)
+    return scores[0], scores[1]
+
+
+# Two-level cache of per-opponent scores keyed by allocation: an in-process
+# LRU in front of an SQLite file shared by every server process. Entries are
+# tied to the pool file's hash and dropped when the pool changes; each
+# ruleset keeps its own rows, so sessions playing different variants share
+# the file without evicting each other.
+class EvalCache:
+    def __init__(self, pool_hash, rules=DEFAULT_RULES, path=CACHE_DB, max_entries=MEMORY_ENTRIES):
+        self.pool_hash = f"{pool_hash}:v{CACHE_VERSION}"
+        self.rules = rules
+        self.dtype = _score_dtype(rules)
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits_memory = self.hits_disk = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            # Files written before rulesets were keyed hold nothing worth keeping
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(results)")]
+            if columns and "rules_key" not in columns:
+                self._db.execute("DROP TABLE results")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "pool_hash TEXT NOT NULL, rules_key TEXT NOT NULL, allocation TEXT NOT NULL, "
+                "scores BLOB NOT NULL, PRIMARY KEY (pool_hash, rules_key, allocation))"
+            )
+            self._db.execute("DELETE FROM results WHERE pool_hash != ?", (self.pool_hash,))
+
+    @staticmethod
+    def _key(allocation):
+        return ",".join(str(int(v)) for v in allocation)
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, allocation):
+        key = self._key(allocation)
+        with self._lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits_memory += 1
+                return self.memory[key]
+            row = self._db.execute(
+                "SELECT scores FROM results WHERE pool_hash = ? AND rules_key = ? AND allocation = ?",
+                (self.pool_hash, self.rules.key, key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            value = _unpack(row[0], self.dtype)
+            self._remember(key, value)
+            return value
+
+    def put(self, allocation, you, them):
+        key = self._key(allocation)
+        blob = _pack(you, them, self.dtype)
+        with self._lock:
+            self._remember(key, _unpack(blob, self.dtype))
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (pool_hash, rules_key, allocation, scores) VALUES (?, ?, ?, ?)",
+                    (self.pool_hash, self.rules.key, key, blob)
+                )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.hits_memory,
+                "disk_hits": self.hits_disk,
+                "misses": self.misses,
+                "memory_entries": len(self.memory),
+                "disk_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
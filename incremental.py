@@ -0,0 +1,67 @@
+import zlib
+
+import numpy as np
+
+from rules import DEFAULT_RULES
+from scoring import castle_digits, kernels
+
+
+def pool_checksum(pool):
+    return zlib.crc32(np.ascontiguousarray(pool).view(np.uint8))
+
+
+def start_evaluation(strategy, pool, pool_key=None, rules=DEFAULT_RULES):
+    k = kernels(rules)
+    strategy = np.array(strategy)
+    digits = castle_digits(strategy, pool)
+    codes = digits.astype(np.int32) @ k.powers
+    table = k.outcome_table[codes]
+    return {
+        "strategy": strategy,
+        "pool_key": pool_checksum(pool) if pool_key is None else pool_key,
+        "rules": rules,
+        # Per-opponent running state: castle outcomes, their base-3 code
+        # (which also fixes every streak) and how many castles were played
+        "digits": digits,
+        "codes": codes,
+        "stop": k.stop_table[codes],
+        "you": table[:, 0],
+        "them": table[:, 1],
+        "rescored": len(pool),
+    }
+
+
+def update_evaluation(state, strategy, pool):
+    k = kernels(state["rules"])
+    strategy = np.array(strategy)
+    digits, codes, stop = state["digits"], state["codes"], state["stop"]
+    affected = np.zeros(len(codes), dtype=bool)
+
+    for c in np.flatnonzero(strategy != state["strategy"]):
+        column = castle_digits(strategy[c], pool[:, c])
+        flipped = np.flatnonzero(column != digits[:, c])
+        codes[flipped] += (column[flipped] - digits[flipped, c]) * k.powers[c]
+        digits[flipped, c] = column[flipped]
+        # A flip only matters if the match was still running at castle c
+        affected[flipped[stop[flipped] > c]] = True
+
+    rows = np.flatnonzero(affected)
+    table = k.outcome_table[codes[rows]]
+    state["you"][rows] = table[:, 0]
+    state["them"][rows] = table[:, 1]
+    stop[rows] = k.stop_table[codes[rows]]
+    state["strategy"] = strategy
+    state["rescored"] = len(rows)
+    return state
+
+
+# Reuses `state` (e.g. kept in st.session_state between reruns) when it was
+# built against the same pool and rules, so an edit only rescores the
+# opponents whose result can change.
+def evaluate_incremental(state, strategy, pool, pool_key=None, rules=DEFAULT_RULES):
+    if pool_key is None:
+        pool_key = pool_checksum(pool)
+    if (state is None or state["pool_key"] != pool_key or state.get("rules") != rules
+            or len(state["codes"]) != len(pool)):
+        return start_evaluation(strategy, pool, pool_key, rules)
+    return update_evaluation(state, strategy, pool)
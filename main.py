@@ -1,6 +1,7 @@
 import streamlit as st
-from practice_page import practice_mode
-from tournament_page import tournament_mode
+import metrics
+from pool_cache import start_pool_warmup
+from rules import VARIANTS
 
 st.set_page_config(
     page_title="Blotto Strategy Game",
@@ -8,10 +9,35 @@ st.set_page_config(
     layout="wide"
 )
 
+# Load the strategy pool while the menu renders; Practice Mode waits for it
+start_pool_warmup()
+
 st.sidebar.title("🎮 Blotto Game Menu")
 mode = st.sidebar.radio("Select Mode", ["Practice Mode", "Tournament Mode"])
+rules = VARIANTS[st.sidebar.selectbox("Game rules", list(VARIANTS), key="rules_variant")]
+st.sidebar.caption(rules.describe())
+st.sidebar.checkbox("⏩ Skip match animations", key="skip_animation")
+show_timings = st.sidebar.checkbox("🐞 Show stage timings", key="debug_timings")
+metrics.start_rerun(show_timings)
+metrics.start_http_server()
 
+# Each mode's page (and its heavy dependencies) is imported the first time
+# that mode is opened
 if mode == "Practice Mode":
-    practice_mode()
+    with metrics.timed("page.practice"):
+        from practice_page import practice_mode
+        practice_mode(rules)
 elif mode == "Tournament Mode":
-    tournament_mode()
+    with metrics.timed("page.tournament"):
+        from tournament_page import tournament_mode
+        tournament_mode(rules)
+
+if show_timings:
+    timings = metrics.rerun_timings()
+    st.sidebar.markdown("**Stage timings (this rerun)**")
+    st.sidebar.table({
+        "Stage": [stage for stage, _ in timings],
+        "ms": [f"{seconds * 1e3:.1f}" for _, seconds in timings],
+    })
+    st.sidebar.download_button("Download metrics", metrics.prometheus_text(), "blotto_metrics.prom")
+metrics.write_prometheus()
@@ -1,131 +1,154 @@
+import json
+
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-import time
-
-NUM_CASTLES = 10
-CASTLE_VALUES = list(range(1, 11))
-
-def animated_soldier_clash_charging(blue_count, red_count, frame_delay=0.1):
-    container = st.empty()
-    i = 0
-    while blue_count - i > 0 and red_count - i > 0:
-        b_left = max(blue_count - i, 0)
-        r_left = max(red_count - i, 0)
-
-        left_pad = "&nbsp;" * (i * 2)
-        right_pad = "&nbsp;" * (i * 2)
-
-        blue_soldiers = "🟦" * b_left
-        red_soldiers = "🟥" * r_left
-        clash_symbol = "⚔️" if b_left > 0 and r_left > 0 else ""
-
-        html = f"""
-        <div style='font-size: 30px; font-family: monospace; line-height: 1.2'>
-            <div>{left_pad}{blue_soldiers} {clash_symbol} {red_soldiers}{right_pad}</div>
-        </div>
-        """
-        container.markdown(html, unsafe_allow_html=True)
-        i += 1
-        time.sleep(frame_delay)
-
-    # Final outcome display
-    remaining = abs(blue_count - red_count)
-    if blue_count > red_count:
-        html = f"<div style='text-align: left; font-size: 28px'>🟦 × {remaining}</div>"
-    elif red_count > blue_count:
-        html = f"<div style='text-align: right; font-size: 28px'>🟥 × {remaining}</div>"
-    else:
-        html = "<div style='text-align: center; font-size: 28px'>💥 All soldiers fell!</div>"
+import streamlit.components.v1 as components
+from rules import DEFAULT_RULES
+from scoring import match_trace
+from charts import allocation_chart
+from metrics import timed
+
+# Frame timings of the browser animation, in milliseconds
+CLASH_FRAME_MS = 100
+CASTLE_PAUSE_MS = 600
+STRIKE_PAUSE_MS = 1500
+
+# The whole match is sent once as JSON and animated by the browser, so the
+# server script returns immediately instead of sleeping between frames
+MATCH_ANIMATION_HTML = """
+<style>
+  body { font-family: sans-serif; margin: 0; }
+  #castle { font-size: 24px; font-weight: bold; margin: 8px 0; }
+  #clash { font-size: 30px; font-family: monospace; line-height: 1.2; min-height: 40px; white-space: nowrap; overflow: hidden; }
+  #result { font-size: 18px; margin: 8px 0; min-height: 24px; }
+  #strike { font-size: 36px; color: red; text-align: center; min-height: 44px; animation: flash 1s infinite; }
+  #score { font-size: 18px; margin-top: 8px; }
+  @keyframes flash { 0% { opacity: 1; } 50% { opacity: 0.1; } 100% { opacity: 1; } }
+  button { margin-top: 8px; }
+</style>
+<div id="castle"></div>
+<div id="clash"></div>
+<div id="result"></div>
+<div id="strike"></div>
+<div id="score"></div>
+<button id="skip">⏩ Skip to result</button>
+<script>
+const trace = __TRACE__;
+const names = __NAMES__;
+const timing = __TIMING__;
+const $ = (id) => document.getElementById(id);
+let skipped = false;
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, skipped ? 0 : ms));
+
+function resultText(c) {
+  if (c.winner === 0) return `Castle ${c.castle} is a draw`;
+  return `${names[c.winner - 1]} wins castle ${c.castle} (${c.value} pts)`;
+}
+
+function showScore(scores) {
+  $("score").textContent = `${names[0]}: ${scores[0]} — ${names[1]}: ${scores[1]}`;
+}
+
+function showFinal() {
+  const last = trace.castles[trace.castles.length - 1];
+  $("castle").textContent = "🏁 Match over";
+  $("clash").textContent = "";
+  $("result").textContent = resultText(last);
+  $("strike").textContent = trace.striker ? `⚡ ${trace.streak_length}-Strike Triggered by ${names[trace.striker - 1]}! ⚡` : "";
+  showScore(trace.final);
+  $("skip").style.display = "none";
+}
+
+async function clash(blue, red) {
+  for (let i = 0; blue - i > 0 && red - i > 0 && !skipped; i++) {
+    const pad = "\\u00a0".repeat(i * 2);
+    $("clash").textContent = `${pad}${"🟦".repeat(blue - i)} ⚔️ ${"🟥".repeat(red - i)}${pad}`;
+    await wait(timing.clash);
+  }
+  const remaining = Math.abs(blue - red);
+  $("clash").style.textAlign = blue > red ? "left" : red > blue ? "right" : "center";
+  $("clash").textContent = blue > red ? `🟦 × ${remaining}` : red > blue ? `🟥 × ${remaining}` : "💥 All soldiers fell!";
+}
+
+async function play() {
+  for (const c of trace.castles) {
+    if (skipped) break;
+    $("castle").textContent = `🏰 Resolving Castle ${c.castle} 🏰`;
+    $("clash").style.textAlign = "left";
+    $("result").textContent = "";
+    await clash(c.soldiers[0], c.soldiers[1]);
+    $("result").textContent = resultText(c);
+    showScore(c.scores);
+    if (c.castle === trace.stop && trace.striker) {
+      $("strike").textContent = `⚡ ${trace.streak_length}-Strike Triggered by ${names[trace.striker - 1]}! ⚡`;
+      await wait(timing.strike);
+    }
+    await wait(timing.castle);
+  }
+  showFinal();
+}
 
+$("skip").onclick = () => { skipped = true; };
+play();
+</script>
+"""
 
-    container.markdown(html, unsafe_allow_html=True)
-    time.sleep(0.5)
 
+def _script_json(value):
+    # Player names are user input; keep them from closing the <script> tag
+    return json.dumps(value).replace("</", "<\\/")
 
-def play_full_match(s1, s2, p1="Player 1", p2="Player 2"):
-    state = {
-        'p1': p1, 'p2': p2,
-        's1': s1, 's2': s2,
-        'current': 0,
-        'score1': 0, 'score2': 0,
-        'consec1': 0, 'consec2': 0,
-        'log': [],
-        'ended': False
-    }
 
-    st.subheader(f"Match: {p1} vs {p2}")
-    while state['current'] < NUM_CASTLES and not state['ended']:
-        i = state['current']
-        a, b = s1[i], s2[i]
-        result = ""
-
-        if a > b:
-            state['score1'] += CASTLE_VALUES[i]
-            state['consec1'] += 1
-            state['consec2'] = 0
-            result = f"{p1} wins castle {i+1} ({CASTLE_VALUES[i]} pts)"
-        elif b > a:
-            state['score2'] += CASTLE_VALUES[i]
-            state['consec2'] += 1
-            state['consec1'] = 0
-            result = f"{p2} wins castle {i+1} ({CASTLE_VALUES[i]} pts)"
-        else:
-            state['consec1'] = state['consec2'] = 0
-            result = f"Castle {i+1} is a draw"
+def match_animation_html(trace, p1="Player 1", p2="Player 2"):
+    timing = {"clash": CLASH_FRAME_MS, "castle": CASTLE_PAUSE_MS, "strike": STRIKE_PAUSE_MS}
+    return (MATCH_ANIMATION_HTML
+            .replace("__TRACE__", _script_json(trace))
+            .replace("__NAMES__", _script_json([str(p1), str(p2)]))
+            .replace("__TIMING__", _script_json(timing)))
 
-        st.markdown(f"## 🏰 Resolving Castle {i + 1} 🏰")
-        animated_soldier_clash_charging(a , b)
 
-        if state['consec1'] == 3:
-            result += f" — {p1} triggers 3-strike rule!"
-            state['score1'] += sum(CASTLE_VALUES[i+1:])
-            state['ended'] = True
-            _three_strike_flash(p1)
+def _log_entry(castle, trace, p1, p2):
+    if castle["winner"] == 1:
+        entry = f"{p1} wins castle {castle['castle']} ({castle['value']} pts)"
+    elif castle["winner"] == 2:
+        entry = f"{p2} wins castle {castle['castle']} ({castle['value']} pts)"
+    else:
+        entry = f"Castle {castle['castle']} is a draw"
+    if castle["castle"] == trace["stop"] and trace["striker"]:
+        entry += f" — {p1 if trace['striker'] == 1 else p2} triggers {trace['streak_length']}-strike rule!"
+    return entry
 
-        elif state['consec2'] == 3:
-            result += f" — {p2} triggers 3-strike rule!"
-            state['score2'] += sum(CASTLE_VALUES[i+1:])
-            state['ended'] = True
-            _three_strike_flash(p2)
 
-        state['log'].append(result)
-        state['current'] += 1
-        time.sleep(0.6)
+# With animate=None the sidebar's "skip animation" setting decides
+def play_full_match(s1, s2, p1="Player 1", p2="Player 2", animate=None, rules=DEFAULT_RULES):
+    if animate is None:
+        animate = not st.session_state.get("skip_animation", False)
+    with timed("match.trace"):
+        trace = match_trace(s1, s2, rules)
 
-    st.write("### Match Log")
-    for entry in state['log']:
-        st.write(entry)
+    st.subheader(f"Match: {p1} vs {p2}")
+    score1, score2 = trace["final"]
+    if animate:
+        with timed("match.animation_html"):
+            html = match_animation_html(trace, p1, p2)
+        # st.iframe replaces components.html in newer Streamlit releases
+        if hasattr(st, "iframe"):
+            st.iframe(html, height=240)
+        else:
+            components.html(html, height=240)
+        # Collapsed so the result isn't given away while the animation runs
+        summary = st.expander("📜 Match log and final score")
+    else:
+        summary = st.container()
 
-    st.success(f"Final Score — {p1}: {state['score1']}, {p2}: {state['score2']}")
+    with summary:
+        st.write("### Match Log")
+        for castle in trace["castles"]:
+            st.write(_log_entry(castle, trace, p1, p2))
+        st.success(f"Final Score — {p1}: {score1}, {p2}: {score2}")
 
     # Bar chart of allocations
-    fig, ax = plt.subplots(figsize=(10, 4))
-    x = np.arange(NUM_CASTLES)
-    width = 0.35
-    ax.bar(x, s1, width, label=p1, color='blue')
-    ax.bar(x + width, s2, width, label=p2, color='red')
-    ax.set_xticks(x + width / 2)
-    ax.set_xticklabels([f"C{i+1}" for i in range(NUM_CASTLES)])
-    ax.set_ylabel("Soldiers")
-    ax.set_title(f"Allocation: {p1} vs {p2}")
-    ax.legend()
-    st.pyplot(fig)
-
-    return state['score1'], state['score2']
-
-
-def _three_strike_flash(player_name):
-    st.markdown(f"""
-        <div style="font-size: 36px; color: red; text-align: center; animation: flash 1s infinite;">
-            ⚡ 3-Strike Triggered by {player_name}! ⚡
-        </div>
-        <style>
-        @keyframes flash {{
-            0% {{ opacity: 1; }}
-            50% {{ opacity: 0.1; }}
-            100% {{ opacity: 1; }}
-        }}
-        </style>
-        """, unsafe_allow_html=True)
-    time.sleep(1.5)
+    with timed("match.chart"):
+        chart = allocation_chart(s1, s2, p1, p2)
+    st.image(chart)
+
+    return score1, score2
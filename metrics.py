@@ -0,0 +1,138 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Recording is on for every stage when BLOTTO_METRICS is set, and otherwise
+# only during reruns that ask for it (the sidebar debug panel)
+ENABLED = os.environ.get("BLOTTO_METRICS", "") not in ("", "0")
+METRICS_FILE = os.environ.get("BLOTTO_METRICS_FILE")
+METRICS_PORT = os.environ.get("BLOTTO_METRICS_PORT")
+METRIC_NAME = "blotto_stage_seconds"
+# Upper bounds in seconds, as in the Prometheus client defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+_NOOP = nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+# stage -> [per-bucket counts (last one is +Inf), sum, count]
+_histograms = {}
+_server = None
+# Set when the port couldn't be bound (e.g. another app process on the same
+# host has it), so later reruns don't retry
+_server_error = None
+log = logging.getLogger(__name__)
+
+
+def enabled():
+    return ENABLED or getattr(_local, "enabled", False)
+
+
+# Called at the top of every Streamlit rerun; each session reruns on its own
+# thread, so the timings collected here belong to this rerun only
+def start_rerun(record=False):
+    _local.enabled = record
+    _local.timings = []
+
+
+def rerun_timings():
+    return list(getattr(_local, "timings", []))
+
+
+def observe(stage, seconds):
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings.append((stage, seconds))
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+
+class _Timer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+# `with timed("stage"):` costs one flag check and a shared no-op context
+# manager when recording is off
+def timed(stage):
+    if not (ENABLED or getattr(_local, "enabled", False)):
+        return _NOOP
+    return _Timer(stage)
+
+
+def prometheus_text():
+    with _lock:
+        snapshot = {stage: (list(h[0]), h[1], h[2]) for stage, h in _histograms.items()}
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in instrumented app stages.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for stage in sorted(snapshot):
+        counts, total, count = snapshot[stage]
+        label = stage.replace("\\", "\\\\").replace('"', '\\"')
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), counts):
+            cumulative += n
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {total:.6f}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=METRICS_FILE):
+    if not path:
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+# Serves prometheus_text() on every path, once per process. http.server is
+# only imported when a port is configured. If the port is taken the failure
+# is logged once and the app carries on without the endpoint.
+def start_http_server(port=METRICS_PORT):
+    global _server, _server_error
+    if not port or _server is not None or _server_error is not None:
+        return _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _server is None and _server_error is None:
+            try:
+                _server = ThreadingHTTPServer(("", int(port)), MetricsHandler)
+            except OSError as e:
+                _server_error = e
+                log.warning("Metrics endpoint not started on port %s: %s", port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,129 @@
+import argparse
+import threading
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from rules import DEFAULT_RULES, add_rules_arguments, rules_from_args
+from scoring import score
+
+BATCH_SIZE = 100_000
+# Rows whose bar positions are drawn at once; bounds the (rows, slots) float
+# keys to a few MB however large the batch
+SAMPLE_CHUNK = 4096
+MAX_SAMPLES = 20_000_000
+
+
+# Uniform over every composition of the ruleset's soldiers into its castles
+# with at least `min_per_castle` each (stars and bars: the castle boundaries
+# are num_castles - 1 distinct slots chosen uniformly). Drawing the keys in
+# row chunks consumes the generator exactly as one (n, slots) draw would.
+def sample_compositions(rng, n, rules=DEFAULT_RULES, min_per_castle=0):
+    num_castles = rules.num_castles
+    spare = rules.total_soldiers - num_castles * min_per_castle
+    if spare < 0:
+        raise ValueError("Minimum allocation exceeds total soldier count.")
+    slots = spare + num_castles - 1
+    dtype = np.int8 if rules.total_soldiers <= np.iinfo(np.int8).max else np.int16
+    samples = np.empty((n, num_castles), dtype=dtype)
+    for start in range(0, n, SAMPLE_CHUNK):
+        rows = min(SAMPLE_CHUNK, n - start)
+        keys = rng.random((rows, slots))
+        bars = np.sort(np.argpartition(keys, num_castles - 2, axis=1)[:, :num_castles - 1], axis=1)
+        edges = np.concatenate([np.full((rows, 1), -1), bars, np.full((rows, 1), slots)], axis=1)
+        samples[start:start + rows] = np.diff(edges, axis=1) - 1 + min_per_castle
+    return samples
+
+
+def _summary(counts, samples, z):
+    rates = counts / max(samples, 1)
+    half_widths = z * np.sqrt(rates * (1 - rates) / max(samples, 1))
+    return {
+        "samples": samples,
+        "wins": int(counts[0]), "draws": int(counts[1]), "losses": int(counts[2]),
+        "win_rate": rates[0], "draw_rate": rates[1], "loss_rate": rates[2],
+        "win_error": half_widths[0], "draw_error": half_widths[1], "loss_error": half_widths[2],
+    }
+
+
+# Streams opponents in vectorized batches until every rate's confidence
+# interval is at most `ci_width` wide (or `max_samples` is reached)
+def estimate_strength(strategy, min_per_castle=0, ci_width=0.005, confidence=0.95,
+                      batch_size=BATCH_SIZE, max_samples=MAX_SAMPLES, seed=None,
+                      progress=None, stop_event=None, rules=DEFAULT_RULES):
+    rng = np.random.default_rng(seed)
+    # Only legal allocations are drawn
+    min_per_castle = max(min_per_castle, rules.min_per_castle)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    strategy = np.asarray(strategy)
+    counts = np.zeros(3, dtype=np.int64)
+    samples = 0
+    started = time.perf_counter()
+    # What a run stopped before its first batch reports
+    summary = dict(_summary(counts, samples, z), seconds=0.0, converged=False)
+
+    while samples < max_samples:
+        if stop_event is not None and stop_event.is_set():
+            break
+        n = min(batch_size, max_samples - samples)
+        you, them = score(strategy, sample_compositions(rng, n, rules, min_per_castle), rules)
+        counts += [np.count_nonzero(you > them), np.count_nonzero(you == them), np.count_nonzero(you < them)]
+        samples += n
+
+        summary = _summary(counts, samples, z)
+        summary["seconds"] = time.perf_counter() - started
+        summary["converged"] = 2 * max(summary["win_error"], summary["draw_error"], summary["loss_error"]) <= ci_width
+        if progress is not None:
+            progress(summary)
+        if summary["converged"]:
+            break
+    return summary
+
+
+# Runs estimate_strength on a daemon thread; the returned job dict is updated
+# in place with the latest summary so a page can poll it between reruns
+def start_background_estimate(strategy, **kwargs):
+    job = {
+        "strategy": tuple(int(v) for v in strategy),
+        "settings": kwargs,
+        "status": "running",
+        "summary": None,
+        "stop": threading.Event(),
+    }
+
+    def run():
+        try:
+            job["summary"] = estimate_strength(
+                strategy, progress=lambda s: job.update(summary=s), stop_event=job["stop"], **kwargs
+            )
+            job["status"] = "stopped" if job["stop"].is_set() else "done"
+        except Exception as exc:
+            job["status"] = f"failed: {exc}"
+
+    job["thread"] = threading.Thread(target=run, daemon=True)
+    job["thread"].start()
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate a strategy's strength against uniformly random allocations.")
+    parser.add_argument("strategy", help="comma-separated soldiers per castle")
+    parser.add_argument("--min-per-castle", type=int, default=0,
+                        help=f"floor for sampled opponents (the pool uses {DEFAULT_RULES.pool_min})")
+    parser.add_argument("--ci-width", type=float, default=0.005, help="target confidence-interval width")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=None)
+    add_rules_arguments(parser)
+    args = parser.parse_args()
+
+    rules = rules_from_args(args)
+    strategy = [int(x) for x in args.strategy.split(",")]
+    s = estimate_strength(strategy, args.min_per_castle, args.ci_width, args.confidence, seed=args.seed, rules=rules)
+    print(f"{s['samples']:,} opponents in {s['seconds']:.1f}s")
+    for label in ("win", "draw", "loss"):
+        print(f"{label:>5}: {s[label + '_rate']:.4f} ± {s[label + '_error']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import time
+
+import numpy as np
+
+from rules import DEFAULT_RULES, add_rules_arguments, rules_from_args
+from scoring import castle_digits, outcome_codes, kernels
+
+
+def random_allocation(rng, rules=DEFAULT_RULES, min_per_castle=0):
+    spare = rules.total_soldiers - min_per_castle * rules.num_castles
+    return min_per_castle + rng.multinomial(spare, np.full(rules.num_castles, 1 / rules.num_castles))
+
+
+# `weights` counts each pool row that many times (e.g. multiplicities of a
+# deduplicated pool)
+def evaluate(allocation, pool, weights=None, rules=DEFAULT_RULES):
+    return _packed_counts(outcome_codes(allocation, pool, rules), weights, packed_table=kernels(rules).packed_table)
+
+
+# Wins are counted in the high 32 bits and draws in the low 32 bits of the
+# packed table, so one gather and one sum count both
+def _packed_counts(codes, weights=None, total=None, packed_table=None):
+    if packed_table is None:
+        packed_table = kernels().packed_table
+    packed = packed_table.take(codes)
+    packed = int(packed.sum()) if weights is None else int(packed @ weights)
+    if total is None:
+        total = len(codes) if weights is None else int(weights.sum())
+    wins, draws = packed >> 32, packed & 0xFFFFFFFF
+    return wins, draws, total - wins - draws
+
+
+def _objective(wins, draws, num_opponents):
+    # Most wins first, draws only break ties
+    return wins * (num_opponents + 1) + draws
+
+
+# Simulated annealing over single-soldier moves. A move from castle i to
+# castle j only changes two digits of every opponent's outcome code, so each
+# candidate is rescored from the running codes instead of from scratch.
+def search_best_response(pool, iterations=200_000, restarts=4, min_per_castle=0,
+                         start_temp=20.0, end_temp=0.2, top_k=5, seed=None,
+                         log_every=1000, progress=None, weights=None, rules=DEFAULT_RULES):
+    rng = np.random.default_rng(seed)
+    k = kernels(rules)
+    min_per_castle = max(min_per_castle, rules.min_per_castle)
+    pool_t = np.ascontiguousarray(np.asarray(pool).T)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.int64)
+    num_opponents = pool_t.shape[1] if weights is None else int(weights.sum())
+    per_restart = max(iterations // restarts, 1)
+    # With every soldier at the floor (or a single castle) no move exists and
+    # the starting allocation is the only one to score
+    if rules.total_soldiers == min_per_castle * rules.num_castles or rules.num_castles == 1:
+        per_restart = 0
+    cooling = (end_temp / start_temp) ** (1 / max(per_restart, 1))
+
+    # Code contribution of castle c holding v soldiers, filled in on demand
+    parts = {}
+
+    def part(c, v):
+        if (c, v) not in parts:
+            parts[c, v] = castle_digits(v, pool_t[c]).astype(np.int32) * k.powers[c]
+        return parts[c, v]
+
+    found = {}
+    history = []
+    started = time.perf_counter()
+    evaluated = 0
+
+    for restart in range(restarts):
+        x = random_allocation(rng, rules, min_per_castle)
+        codes = sum(part(c, x[c]) for c in range(rules.num_castles))
+        wins, draws, losses = _packed_counts(codes, weights, num_opponents, k.packed_table)
+        current = _objective(wins, draws, num_opponents)
+        best = (current, x.copy(), (wins, draws, losses))
+        temp = start_temp
+
+        for step in range(per_restart):
+            donors = np.flatnonzero(x > min_per_castle)
+            i = donors[rng.integers(len(donors))]
+            j = rng.integers(rules.num_castles - 1)
+            j += j >= i
+
+            new_codes = codes + part(i, x[i] - 1)
+            new_codes -= part(i, x[i])
+            new_codes += part(j, x[j] + 1)
+            new_codes -= part(j, x[j])
+            cand_wins, cand_draws, cand_losses = _packed_counts(new_codes, weights, num_opponents, k.packed_table)
+            candidate = _objective(cand_wins, cand_draws, num_opponents)
+            evaluated += 1
+
+            gain = (candidate - current) / (num_opponents + 1)
+            if gain >= 0 or rng.random() < np.exp(gain / temp):
+                x[i] -= 1
+                x[j] += 1
+                codes = new_codes
+                current = candidate
+                if current > best[0]:
+                    best = (current, x.copy(), (cand_wins, cand_draws, cand_losses))
+            temp *= cooling
+
+            if step % log_every == 0:
+                history.append({
+                    "candidates": evaluated,
+                    "restart": restart + 1,
+                    "temperature": temp,
+                    "current_wins": current // (num_opponents + 1),
+                    "best_wins": best[2][0],
+                    "seconds": time.perf_counter() - started,
+                })
+                if progress is not None:
+                    progress(evaluated / (per_restart * restarts))
+
+        found[tuple(int(v) for v in best[1])] = best[2]
+
+    best_found = sorted(found.items(), key=lambda item: _objective(item[1][0], item[1][1], num_opponents), reverse=True)
+    return {
+        "best": [
+            {"allocation": list(alloc), "wins": w, "draws": d, "losses": l}
+            for alloc, (w, d, l) in best_found[:top_k]
+        ],
+        "history": history,
+        "candidates": evaluated,
+        "seconds": time.perf_counter() - started,
+        "rules": rules,
+    }
+
+
+# Change in wins, draws and losses for every single-soldier move: entry
+# [i, j] moves one soldier from castle i to castle j. All 90 moves are scored
+# in one batch from the current codes plus two per-castle digit deltas; moves
+# that are impossible (i == j or castle i at the floor) are NaN.
+def move_sensitivity(strategy, pool, weights=None, min_per_castle=0, rules=DEFAULT_RULES):
+    k = kernels(rules)
+    x = np.asarray(strategy)
+    pool = np.asarray(pool)
+    digits = castle_digits(x, pool).astype(np.int32)
+    codes = digits @ k.powers
+    minus = (castle_digits(x - 1, pool).astype(np.int32) - digits) * k.powers
+    plus = (castle_digits(x + 1, pool).astype(np.int32) - digits) * k.powers
+
+    # (from, to, opponent) codes after each move
+    moved = codes[None, None, :] + minus.T[:, None, :] + plus.T[None, :, :]
+    packed = k.packed_table.take(moved)
+    packed = packed.sum(axis=-1) if weights is None else packed @ np.asarray(weights, dtype=np.int64)
+    base_wins, base_draws, base_losses = _packed_counts(codes, weights, packed_table=k.packed_table)
+    total = base_wins + base_draws + base_losses
+    wins, draws = packed >> 32, packed & 0xFFFFFFFF
+
+    delta = np.stack([wins - base_wins, draws - base_draws, (total - wins - draws) - base_losses]).astype(float)
+    invalid = np.eye(rules.num_castles, dtype=bool) | (x <= max(min_per_castle, rules.min_per_castle))[:, None]
+    delta[:, invalid] = np.nan
+    return {"wins": delta[0], "draws": delta[1], "losses": delta[2], "base": (base_wins, base_draws, base_losses)}
+
+
+def main():
+    from payoff import read_pool, POOL_CSV
+    from pool_bundle import deduplicate
+
+    parser = argparse.ArgumentParser(description="Search for the allocation that beats the most pool strategies.")
+    parser.add_argument("--pool", default=POOL_CSV, help="strategy pool CSV")
+    parser.add_argument("--iterations", type=int, default=200_000, help="candidate moves to try in total")
+    parser.add_argument("--restarts", type=int, default=4, help="independent annealing runs")
+    parser.add_argument("--min-per-castle", type=int, default=0, help="floor on soldiers per castle")
+    parser.add_argument("--seed", type=int, default=None)
+    add_rules_arguments(parser)
+    args = parser.parse_args()
+
+    unique, counts, _ = deduplicate(read_pool(args.pool)[0])
+    result = search_best_response(
+        unique, args.iterations, args.restarts, args.min_per_castle, seed=args.seed, weights=counts,
+        rules=rules_from_args(args)
+    )
+    print(f"Tried {result['candidates']} candidates in {result['seconds']:.1f}s")
+    for entry in result["best"]:
+        alloc = ",".join(map(str, entry["allocation"]))
+        print(f"{alloc}  wins={entry['wins']} draws={entry['draws']} losses={entry['losses']}")
+
+
+if __name__ == "__main__":
+    main()
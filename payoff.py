@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from rules import DEFAULT_RULES
+from scoring import score
+from pool_bundle import load_pool, opponent_types, pool_digest
+
+POOL_CSV = "strategy_pool_full_min2.csv"
+OUTPUT_DIR = "payoff_results"
+COUNTS_FILE = "counts.npy"
+DONE_FILE = "done.npy"
+# What the counts were computed from; a partial run is only resumed for the same
+RUN_FILE = "run.json"
+LEADERBOARD_CSV = "pool_leaderboard.csv"
+TYPE_MATRIX_CSV = "pool_type_matrix.csv"
+
+# Rows of the pool scored per task; each task holds a (block, N, 10) array
+BLOCK_SIZE = 128
+
+_worker_pool = None
+_worker_onehot = None
+
+
+def read_pool(path=POOL_CSV):
+    return load_pool(path)
+
+
+def _init_worker(path):
+    global _worker_pool, _worker_onehot
+    strat_array, _, type_codes, type_names = read_pool(path)
+    _worker_pool, _, _worker_onehot = opponent_types(strat_array, type_codes, len(type_names))
+
+
+def score_block(pool, onehot, start, stop):
+    you, them = score(pool[start:stop, None, :], pool[None, :, :])
+    margin = you.astype(np.int16) - them
+    return np.stack([
+        (margin > 0).astype(np.float64) @ onehot,
+        (margin == 0).astype(np.float64) @ onehot,
+        (margin < 0).astype(np.float64) @ onehot,
+    ], axis=-1).astype(np.int32)
+
+
+def _run_block(block):
+    start, stop = block
+    return start, stop, score_block(_worker_pool, _worker_onehot, start, stop)
+
+
+def _read_run(run_path):
+    try:
+        with open(run_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _open_outputs(out_dir, num_strats, num_types, num_blocks, fresh, run):
+    counts_path = os.path.join(out_dir, COUNTS_FILE)
+    done_path = os.path.join(out_dir, DONE_FILE)
+    run_path = os.path.join(out_dir, RUN_FILE)
+    shape = (num_strats, num_types, 3)
+    if not fresh and os.path.exists(counts_path) and os.path.exists(done_path) and _read_run(run_path) == run:
+        counts = np.load(counts_path, mmap_mode="r+")
+        done = np.load(done_path, mmap_mode="r+")
+        if counts.shape == shape and done.shape == (num_blocks,):
+            return counts, done
+    os.makedirs(out_dir, exist_ok=True)
+    counts = np.lib.format.open_memmap(counts_path, mode="w+", dtype=np.int32, shape=shape)
+    done = np.lib.format.open_memmap(done_path, mode="w+", dtype=np.uint8, shape=(num_blocks,))
+    # Written once the new arrays exist, so a crash in between can't pair it
+    # with the old counts
+    with open(run_path, "w") as f:
+        json.dump(run, f, indent=2)
+    return counts, done
+
+
+def compute_payoffs(pool_path=POOL_CSV, out_dir=OUTPUT_DIR, block_size=BLOCK_SIZE, workers=None, fresh=False):
+    strat_array, names, type_codes, type_names = read_pool(pool_path)
+    unique, inverse, onehot = opponent_types(strat_array, type_codes, len(type_names))
+    num_unique = len(unique)
+    blocks = [(s, min(s + block_size, num_unique)) for s in range(0, num_unique, block_size)]
+    # score() plays the standard game
+    run = {"pool_sha256": pool_digest(pool_path), "rules": DEFAULT_RULES.key, "block_size": block_size}
+    counts, done = _open_outputs(out_dir, num_unique, len(type_names), len(blocks), fresh, run)
+
+    todo = [(b, block) for b, block in enumerate(blocks) if not done[b]]
+    print(f"{num_unique} distinct allocations in a pool of {len(strat_array)}")
+    print(f"{len(blocks) - len(todo)}/{len(blocks)} blocks already done, {len(todo)} to go")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pool_path,)) as executor:
+        futures = {executor.submit(_run_block, block): b for b, block in todo}
+        for n, future in enumerate(as_completed(futures), 1):
+            start, stop, block_counts = future.result()
+            counts[start:stop] = block_counts
+            counts.flush()
+            # Mark the block done only after its counts are on disk
+            done[futures[future]] = 1
+            done.flush()
+            if n % 10 == 0 or n == len(todo):
+                print(f"  {n}/{len(todo)} blocks")
+
+    return summarize(np.asarray(counts), inverse, onehot, names, type_codes, type_names, out_dir)
+
+
+# `counts` holds results per distinct allocation (rows of `onehot`) against
+# every opponent type; `inverse` maps each pool entry to its allocation
+def summarize(counts, inverse, onehot, names, type_codes, type_names, out_dir=OUTPUT_DIR):
+    totals = counts.sum(axis=1)[inverse]
+    # Every strategy draws against itself; that match is not part of the pool
+    totals[:, 1] -= 1
+    leaderboard = pd.DataFrame({
+        "name": names,
+        "type": type_names[type_codes],
+        "wins": totals[:, 0],
+        "draws": totals[:, 1],
+        "losses": totals[:, 2],
+    })
+    leaderboard["win_rate"] = leaderboard["wins"] / totals.sum(axis=1)
+    leaderboard = leaderboard.sort_values(["wins", "draws"], ascending=False, ignore_index=True)
+    leaderboard.insert(0, "rank", np.arange(1, len(leaderboard) + 1))
+
+    num_types = len(type_names)
+    by_type = (onehot.astype(np.int64).T @ counts.reshape(len(counts), -1)).reshape(num_types, num_types, 3)
+    by_type[np.arange(num_types), np.arange(num_types), 1] -= np.bincount(type_codes, minlength=num_types)
+    row_type, col_type = np.meshgrid(type_names, type_names, indexing="ij")
+    type_matrix = pd.DataFrame({
+        "type": row_type.ravel(),
+        "opponent_type": col_type.ravel(),
+        "wins": by_type[..., 0].ravel(),
+        "draws": by_type[..., 1].ravel(),
+        "losses": by_type[..., 2].ravel(),
+    })
+    type_matrix["win_rate"] = type_matrix["wins"] / by_type.sum(axis=-1).ravel()
+
+    leaderboard.to_csv(os.path.join(out_dir, LEADERBOARD_CSV), index=False)
+    type_matrix.to_csv(os.path.join(out_dir, TYPE_MATRIX_CSV), index=False)
+    return leaderboard, type_matrix
+
+
+def load_summaries(out_dir=OUTPUT_DIR):
+    leaderboard_path = os.path.join(out_dir, LEADERBOARD_CSV)
+    type_matrix_path = os.path.join(out_dir, TYPE_MATRIX_CSV)
+    if not (os.path.exists(leaderboard_path) and os.path.exists(type_matrix_path)):
+        return None, None
+    return pd.read_csv(leaderboard_path), pd.read_csv(type_matrix_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every pool strategy against the rest of the pool.")
+    parser.add_argument("--pool", default=POOL_CSV, help="strategy pool CSV")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="directory for counts and summary tables")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="pool rows per task")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--fresh", action="store_true", help="ignore a partial run and start over")
+    args = parser.parse_args()
+
+    leaderboard, type_matrix = compute_payoffs(args.pool, args.out, args.block_size, args.workers, args.fresh)
+    print(leaderboard.head(10).to_string(index=False))
+    type_summary = type_matrix.groupby("type")[["wins", "draws", "losses"]].sum()
+    type_summary["win_rate"] = type_summary["wins"] / type_summary.sum(axis=1)
+    print(type_summary.sort_values("win_rate", ascending=False).to_string())
+
+
+if __name__ == "__main__":
+    main()
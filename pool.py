@@ -1,72 +1,77 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
-
-NUM_CASTLES = 10
-TOTAL_SOLDIERS = 100
-BASELINE_MIN = 2  # each castle gets at least 2 soldiers
-
-def normalize_allocation_with_min(weights, min_per_castle=BASELINE_MIN):
-    base = np.full(NUM_CASTLES, min_per_castle)
-    remaining = TOTAL_SOLDIERS - base.sum()
+from rules import DEFAULT_RULES, add_rules_arguments, rules_from_args
+from pool_bundle import PoolBundleWriter, bundle_path, file_digest
+
+POOL_CSV = "strategy_pool_full_min2.csv"
+CHUNK_SIZE = 100_000
+MIN_POOL_CASTLES = 4
+
+def normalize_allocation_with_min(weights, min_per_castle=None, rules=DEFAULT_RULES):
+    return normalize_allocations_with_min(np.asarray(weights)[None, :], min_per_castle, rules)[0]
+
+# Row-wise version of the floor + largest-remainder rounding for an (n,
+# castles) weight matrix; min_per_castle defaults to the ruleset's pool floor.
+# argsort keeps its default kind so ties in the fractional parts are broken
+# exactly as the per-row version always did.
+def normalize_allocations_with_min(weights, min_per_castle=None, rules=DEFAULT_RULES):
+    min_per_castle = rules.pool_min if min_per_castle is None else min_per_castle
+    num_castles = np.shape(weights)[1]
+    remaining = rules.total_soldiers - num_castles * min_per_castle
     if remaining < 0:
         raise ValueError("Minimum allocation exceeds total soldier count.")
     weights = np.array(weights, dtype=np.float64)
-    weights = weights / weights.sum() * remaining
+    weights = weights / weights.sum(axis=1, keepdims=True) * remaining
     rounded = np.floor(weights).astype(int)
-    remainder = remaining - rounded.sum()
+    remainder = remaining - rounded.sum(axis=1)
     frac = weights - rounded
-    indices = np.argsort(-frac)
-    for i in range(remainder):
-        rounded[indices[i]] += 1
-    return base + rounded
+    indices = np.argsort(-frac, axis=1)
+    ranks = np.empty_like(indices)
+    np.put_along_axis(ranks, indices, np.arange(num_castles)[None, :], axis=1)
+    rounded += ranks < remainder[:, None]
+    return min_per_castle + rounded
 
 # Updated generators with minimum allocation
-def generate_high_value_stacker(n):
-    strats = []
-    for _ in range(n):
-        weights = np.zeros(NUM_CASTLES)
-        weights[6:10] = np.random.dirichlet(np.ones(4))
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['high_value_stacker'] * n
-
-def generate_mid_range_controller(n):
-    strats = []
-    for _ in range(n):
-        weights = np.zeros(NUM_CASTLES)
-        weights[3:7] = np.random.dirichlet(np.ones(4))
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['mid_range_controller'] * n
-
-def generate_balanced(n):
-    strats = []
-    for _ in range(n):
-        weights = np.arange(1, NUM_CASTLES + 1) + np.random.uniform(-0.5, 0.5, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['balanced'] * n
-
-def generate_low_castle_attacker(n):
-    strats = []
-    for _ in range(n):
-        weights = np.zeros(NUM_CASTLES)
-        weights[0:5] = np.random.dirichlet(np.ones(5))
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['low_castle_attacker'] * n
-
-def generate_reverse_stacker(n):
-    strats = []
-    for _ in range(n):
-        weights = np.linspace(10, 1, NUM_CASTLES) + np.random.normal(0, 1, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['reverse_stacker'] * n
-
-def generate_turtle(n):
-    strats = []
-    for _ in range(n):
-        base = np.full(NUM_CASTLES, TOTAL_SOLDIERS // NUM_CASTLES)
-        perturb = np.random.randint(-2, 3, NUM_CASTLES)
-        noisy = np.clip(base + perturb, 0, None)
-        strats.append(normalize_allocation_with_min(noisy))
-    return strats, ['turtle'] * n
+def generate_high_value_stacker(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.zeros((n, nc))
+    weights[:, -4:] = rng.dirichlet(np.ones(4), size=n)
+    return normalize_allocations_with_min(weights, rules=rules), ['high_value_stacker'] * n
+
+def generate_mid_range_controller(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.zeros((n, nc))
+    start = (nc - 4) // 2
+    weights[:, start:start + 4] = rng.dirichlet(np.ones(4), size=n)
+    return normalize_allocations_with_min(weights, rules=rules), ['mid_range_controller'] * n
+
+def generate_balanced(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.arange(1, nc + 1) + rng.uniform(-0.5, 0.5, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['balanced'] * n
+
+def generate_low_castle_attacker(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.zeros((n, nc))
+    weights[:, :nc // 2] = rng.dirichlet(np.ones(nc // 2), size=n)
+    return normalize_allocations_with_min(weights, rules=rules), ['low_castle_attacker'] * n
+
+def generate_reverse_stacker(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.linspace(nc, 1, nc) + rng.normal(0, 1, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['reverse_stacker'] * n
+
+def generate_turtle(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    base = np.full(nc, rules.total_soldiers // nc)
+    perturb = rng.integers(-2, 3, (n, nc))
+    noisy = np.clip(base + perturb, 0, None)
+    return normalize_allocations_with_min(noisy, rules=rules), ['turtle'] * n
 
 # Re-generate the 1500 core strategies
 core_strategy_counts = {
@@ -78,10 +83,6 @@ core_strategy_counts = {
     'turtle': 250
 }
 
-all_strats = []
-all_names = []
-all_types = []
-
 generators = {
     'high_value_stacker': generate_high_value_stacker,
     'mid_range_controller': generate_mid_range_controller,
@@ -91,55 +92,43 @@ generators = {
     'turtle': generate_turtle
 }
 
-for strat_type, count in core_strategy_counts.items():
-    strat_list, labels = generators[strat_type](count)
-    for i, strat in enumerate(strat_list):
-        all_strats.append(strat)
-        all_names.append(f"{strat_type}_{i+1}")
-        all_types.append(strat_type)
-
-# Convert to DataFrame and save
-df_core = pd.DataFrame(all_strats, columns=[f"C{i+1}" for i in range(NUM_CASTLES)])
-df_core['name'] = all_names
-df_core['type'] = all_types
-
-
-# Streak-focused strategy generators with min 2 per castle
-
-def generate_anti_streak_blocker(n):
-    strats = []
-    for _ in range(n):
-        weights = np.ones(NUM_CASTLES)
-        for i in range(0, NUM_CASTLES - 2):
-            weights[i:i+3] += np.random.uniform(0, 1.5)  # contest every 3-castle segment
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['anti_streak_blocker'] * n
-
-def generate_3_strike_hunter(n):
-    strats = []
-    for _ in range(n):
-        start = np.random.randint(0, NUM_CASTLES - 2)
-        weights = np.ones(NUM_CASTLES)
-        weights[start:start+3] += np.random.uniform(3, 6, size=3)  # load specific triple
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['three_strike_hunter'] * n
-
-def generate_streak_breaker(n):
-    strats = []
-    for _ in range(n):
-        weights = np.random.uniform(1, 2, NUM_CASTLES)
-        weights[2::3] += 2  # castles 3, 6, 9...
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['streak_breaker'] * n
-
-def generate_early_castle_blitz(n):
-    strats = []
-    for _ in range(n):
-        weights = np.zeros(NUM_CASTLES)
-        weights[0:3] = np.random.dirichlet(np.ones(3)) * 2  # triple early stack
-        weights += np.random.uniform(0.5, 1.5, NUM_CASTLES)  # some background spread
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['early_castle_blitz'] * n
+
+
+# Streak-focused strategy generators with min 2 per castle; they target the
+# ruleset's streak length (3-castle runs when the streak rule is off)
+
+def generate_anti_streak_blocker(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    streak = rules.streak_length or 3
+    weights = np.ones((n, nc))
+    bumps = rng.uniform(0, 1.5, (n, nc - streak + 1))
+    for i in range(0, nc - streak + 1):
+        weights[:, i:i+streak] += bumps[:, i:i+1]  # contest every streak-long segment
+    return normalize_allocations_with_min(weights, rules=rules), ['anti_streak_blocker'] * n
+
+def generate_3_strike_hunter(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    streak = rules.streak_length or 3
+    rows = np.arange(n)[:, None]
+    start = rng.integers(0, nc - streak + 1, n)
+    weights = np.ones((n, nc))
+    weights[rows, start[:, None] + np.arange(streak)] += rng.uniform(3, 6, size=(n, streak))  # load specific run
+    return normalize_allocations_with_min(weights, rules=rules), ['three_strike_hunter'] * n
+
+def generate_streak_breaker(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    streak = rules.streak_length or 3
+    weights = rng.uniform(1, 2, (n, nc))
+    weights[:, streak - 1::streak] += 2  # castles 3, 6, 9... under the 3-strike rule
+    return normalize_allocations_with_min(weights, rules=rules), ['streak_breaker'] * n
+
+def generate_early_castle_blitz(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    streak = rules.streak_length or 3
+    weights = np.zeros((n, nc))
+    weights[:, :streak] = rng.dirichlet(np.ones(streak), size=n) * 2  # early run stack
+    weights += rng.uniform(0.5, 1.5, (n, nc))  # some background spread
+    return normalize_allocations_with_min(weights, rules=rules), ['early_castle_blitz'] * n
 
 # Define count per strategy
 streak_strategy_counts = {
@@ -157,57 +146,35 @@ streak_generators = {
     'early_castle_blitz': generate_early_castle_blitz
 }
 
-# Generate
-streak_strats = []
-streak_names = []
-streak_types = []
-
-for strat_type, count in streak_strategy_counts.items():
-    strat_list, labels = streak_generators[strat_type](count)
-    for i, strat in enumerate(strat_list):
-        streak_strats.append(strat)
-        streak_names.append(f"{strat_type}_{i+1}")
-        streak_types.append(strat_type)
-
-# Save to DataFrame
-df_streak = pd.DataFrame(streak_strats, columns=[f"C{i+1}" for i in range(NUM_CASTLES)])
-df_streak['name'] = streak_names
-df_streak['type'] = streak_types
 
 
-import random
-
 # === Psychological & Deceptive Strategy Generators ===
 
-def generate_spike_distraction(n):
-    strats = []
-    for _ in range(n):
-        spike = np.random.randint(0, NUM_CASTLES)
-        weights = np.random.uniform(1, 2, NUM_CASTLES)
-        weights[spike] += np.random.uniform(10, 20)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['spike_distraction'] * n
-
-def generate_mirror_baiter(n):
-    strats = []
-    for _ in range(n):
-        weights = np.ones(NUM_CASTLES)
-        if np.random.rand() < 0.5:
-            weights[::2] += np.random.uniform(1, 3, len(weights[::2]))  # even castles
-        else:
-            weights[1::2] += np.random.uniform(1, 3, len(weights[1::2]))  # odd castles
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['mirror_baiter'] * n
-
-def generate_decoy_gambit(n):
-    strats = []
-    for _ in range(n):
-        weights = np.random.uniform(1, 2, NUM_CASTLES)
-        high = np.argmax(weights)
-        weights[high] *= 0.95  # slightly under-invest in the most tempting castle
-        weights += np.random.uniform(0.5, 1, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['decoy_gambit'] * n
+def generate_spike_distraction(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    rows = np.arange(n)
+    spike = rng.integers(0, nc, n)
+    weights = rng.uniform(1, 2, (n, nc))
+    weights[rows, spike] += rng.uniform(10, 20, n)
+    return normalize_allocations_with_min(weights, rules=rules), ['spike_distraction'] * n
+
+def generate_mirror_baiter(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.ones((n, nc))
+    bumps = rng.uniform(1, 3, (n, (nc + 1) // 2))
+    even = rng.random(n) < 0.5
+    weights[even, ::2] += bumps[even]  # even castles
+    weights[~even, 1::2] += bumps[~even, :nc // 2]  # odd castles
+    return normalize_allocations_with_min(weights, rules=rules), ['mirror_baiter'] * n
+
+def generate_decoy_gambit(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    rows = np.arange(n)
+    weights = rng.uniform(1, 2, (n, nc))
+    high = np.argmax(weights, axis=1)
+    weights[rows, high] *= 0.95  # slightly under-invest in the most tempting castle
+    weights += rng.uniform(0.5, 1, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['decoy_gambit'] * n
 
 # deceptive strategy counts
 deceptive_strategy_counts = {
@@ -222,17 +189,6 @@ deceptive_generators = {
     'decoy_gambit': generate_decoy_gambit
 }
 
-deceptive_strats, deceptive_names, deceptive_types = [], [], []
-for strat_type, count in deceptive_strategy_counts.items():
-    strat_list, labels = deceptive_generators[strat_type](count)
-    for i, strat in enumerate(strat_list):
-        deceptive_strats.append(strat)
-        deceptive_names.append(f"{strat_type}_{i+1}")
-        deceptive_types.append(strat_type)
-
-df_deceptive = pd.DataFrame(deceptive_strats, columns=[f"C{i+1}" for i in range(NUM_CASTLES)])
-df_deceptive['name'] = deceptive_names
-df_deceptive['type'] = deceptive_types
 
 # === Random Strategy Generator ===
 
@@ -249,109 +205,86 @@ random_name_pool = [
     "rusty_alarm", "compressed_mango", "looping_ostrich", "delirious_banana", "floating_compass"
 ]
 
-def generate_random_named_strats(n):
-    strats = []
-    names = []
-    types = []
-    for i in range(n):
-        weights = np.random.rand(NUM_CASTLES)
-        strat = normalize_allocation_with_min(weights)
-        strats.append(strat)
-        name = f"{random.choice(random_name_pool)}_{i+1}"
-        names.append(name)
-        types.append("random")
+def generate_random_named_strats(n, rng, start=0, rules=DEFAULT_RULES):
+    weights = rng.random((n, rules.num_castles))
+    strats = normalize_allocations_with_min(weights, rules=rules)
+    picks = rng.integers(0, len(random_name_pool), n)
+    names = [f"{random_name_pool[p]}_{start+i+1}" for i, p in enumerate(picks)]
+    types = ["random"] * n
     return strats, names, types
 
-random_strats, random_names, random_types = generate_random_named_strats(5550)
-df_random = pd.DataFrame(random_strats, columns=[f"C{i+1}" for i in range(NUM_CASTLES)])
-df_random['name'] = random_names
-df_random['type'] = random_types
 
 # Implement remaining deception + dynamic/adaptive strategies
 
-def generate_trojan_horse(n):
-    strats = []
-    for _ in range(n):
-        zero_castle = np.random.randint(7, 10)  # likely to decoy castle 10, 9, or 8
-        weights = np.random.uniform(1, 2, NUM_CASTLES)
-        weights[zero_castle] = 0
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['trojan_horse'] * n
-
-def generate_value_thief(n):
-    strats = []
-    for _ in range(n):
-        weights = np.random.uniform(1, 2, NUM_CASTLES)
-        top_castle = NUM_CASTLES - 1
-        weights[top_castle] *= 0.9 + np.random.uniform(-0.05, 0.05)  # target tie near-castle 10
-        weights += np.random.uniform(0.5, 1.5, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['value_thief'] * n
-
-def generate_min_force_dominator(n):
-    strats = []
-    for _ in range(n):
-        weights = 1 / (np.arange(1, NUM_CASTLES + 1)) + np.random.uniform(0, 0.2, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['min_force_dominator'] * n
-
-def generate_point_denial_specialist(n):
-    strats = []
-    for _ in range(n):
-        weights = np.ones(NUM_CASTLES)
-        weights[-3:] += np.random.uniform(1, 3, 3)  # castles 8–10
-        weights += np.random.uniform(0, 1, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['point_denial_specialist'] * n
-
-def generate_strategic_sacrifice(n):
-    strats = []
-    for _ in range(n):
-        weights = np.random.uniform(1, 2, NUM_CASTLES)
-        skip = np.random.choice(range(NUM_CASTLES), size=2, replace=False)
-        weights[skip] = 0
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['strategic_sacrifice'] * n
-
-def generate_wave_strategist(n):
-    strats = []
-    for _ in range(n):
-        x = np.linspace(0, 2 * np.pi, NUM_CASTLES)
-        weights = (np.sin(x) + 1.2) + np.random.uniform(0, 0.3, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['wave_strategist'] * n
-
-def generate_domino_player(n):
-    strats = []
-    for _ in range(n):
-        weights = np.zeros(NUM_CASTLES)
-        pairs = [(0,1), (3,4), (6,7)]
-        chosen = random.choice(pairs)
-        weights[chosen[0]] = np.random.uniform(1, 3)
-        weights[chosen[1]] = np.random.uniform(1, 3)
-        weights += np.random.uniform(0.5, 1.5, NUM_CASTLES)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['domino_player'] * n
-
-def generate_nuclear_option(n):
-    strats = []
-    for _ in range(n):
-        full = np.zeros(NUM_CASTLES)
-        target = np.random.randint(1, 9)  # avoid extremes
-        full[target] = TOTAL_SOLDIERS
-        full = np.clip(full, BASELINE_MIN, TOTAL_SOLDIERS)
-        strats.append(normalize_allocation_with_min(full))
-    return strats, ['nuclear_option'] * n
-
-def generate_chaos_agent(n):
-    strats = []
-    for _ in range(n):
-        weights = np.random.uniform(0.1, 1, NUM_CASTLES)
-        weights[0] += np.random.uniform(1, 3)
-        weights[4] += np.random.uniform(1, 3)
-        weights[9] += np.random.uniform(1, 3)
-        strats.append(normalize_allocation_with_min(weights))
-    return strats, ['chaos_agent'] * n
+def generate_trojan_horse(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    rows = np.arange(n)
+    zero_castle = rng.integers(nc - 3, nc, n)  # likely to decoy the top three castles
+    weights = rng.uniform(1, 2, (n, nc))
+    weights[rows, zero_castle] = 0
+    return normalize_allocations_with_min(weights, rules=rules), ['trojan_horse'] * n
+
+def generate_value_thief(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = rng.uniform(1, 2, (n, nc))
+    top_castle = nc - 1
+    weights[:, top_castle] *= 0.9 + rng.uniform(-0.05, 0.05, n)  # target tie near-castle 10
+    weights += rng.uniform(0.5, 1.5, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['value_thief'] * n
+
+def generate_min_force_dominator(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = 1 / (np.arange(1, nc + 1)) + rng.uniform(0, 0.2, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['min_force_dominator'] * n
+
+def generate_point_denial_specialist(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = np.ones((n, nc))
+    weights[:, -3:] += rng.uniform(1, 3, (n, 3))  # castles 8–10
+    weights += rng.uniform(0, 1, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['point_denial_specialist'] * n
+
+def generate_strategic_sacrifice(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    rows = np.arange(n)[:, None]
+    weights = rng.uniform(1, 2, (n, nc))
+    skip = np.argsort(rng.random((n, nc)), axis=1)[:, :2]  # two distinct castles
+    weights[rows, skip] = 0
+    return normalize_allocations_with_min(weights, rules=rules), ['strategic_sacrifice'] * n
+
+def generate_wave_strategist(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    x = np.linspace(0, 2 * np.pi, nc)
+    weights = (np.sin(x) + 1.2) + rng.uniform(0, 0.3, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['wave_strategist'] * n
+
+def generate_domino_player(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    rows = np.arange(n)
+    pairs = np.array([(i, i + 1) for i in range(0, nc - 1, 3)])
+    chosen = pairs[rng.integers(0, len(pairs), n)]
+    weights = np.zeros((n, nc))
+    weights[rows, chosen[:, 0]] = rng.uniform(1, 3, n)
+    weights[rows, chosen[:, 1]] = rng.uniform(1, 3, n)
+    weights += rng.uniform(0.5, 1.5, (n, nc))
+    return normalize_allocations_with_min(weights, rules=rules), ['domino_player'] * n
+
+def generate_nuclear_option(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    rows = np.arange(n)
+    full = np.zeros((n, nc))
+    target = rng.integers(1, nc - 1, n)  # avoid extremes
+    full[rows, target] = rules.total_soldiers
+    full = np.clip(full, rules.pool_min, rules.total_soldiers)
+    return normalize_allocations_with_min(full, rules=rules), ['nuclear_option'] * n
+
+def generate_chaos_agent(n, rng, rules=DEFAULT_RULES):
+    nc = rules.num_castles
+    weights = rng.uniform(0.1, 1, (n, nc))
+    weights[:, 0] += rng.uniform(1, 3, n)
+    weights[:, nc // 2 - 1] += rng.uniform(1, 3, n)
+    weights[:, nc - 1] += rng.uniform(1, 3, n)
+    return normalize_allocations_with_min(weights, rules=rules), ['chaos_agent'] * n
 
 # define counts
 additional_strategy_counts = {
@@ -379,20 +312,126 @@ additional_generators = {
     'chaos_agent': generate_chaos_agent
 }
 
-# generate and save
-final_strats, final_names, final_types = [], [], []
-for strat_type, count in additional_strategy_counts.items():
-    strat_list, labels = additional_generators[strat_type](count)
-    for i, strat in enumerate(strat_list):
-        final_strats.append(strat)
-        final_names.append(f"{strat_type}_{i+1}")
-        final_types.append(strat_type)
+random_strategy_count = 5550
+
+all_generators = {**generators, **streak_generators, **deceptive_generators, **additional_generators}
+
+# The shipped pool: every family in the order it is written out
+DEFAULT_COUNTS = {
+    **core_strategy_counts,
+    **streak_strategy_counts,
+    **deceptive_strategy_counts,
+    **additional_strategy_counts,
+    'random': random_strategy_count
+}
+
+# Fixed position of every type, used to derive its seed substreams, so a type
+# draws the same strategies whatever other counts are requested
+TYPE_ORDER = list(all_generators) + ['random']
 
-df_final = pd.DataFrame(final_strats, columns=[f"C{i+1}" for i in range(NUM_CASTLES)])
-df_final['name'] = final_names
-df_final['type'] = final_types
+
+def generate_chunk(spec):
+    strat_type, start, n, seed_seq, rules = spec
+    rng = np.random.default_rng(seed_seq)
+    if strat_type == 'random':
+        return generate_random_named_strats(n, rng, start, rules)
+    strats, types = all_generators[strat_type](n, rng, rules)
+    names = [f"{strat_type}_{start+i+1}" for i in range(n)]
+    return strats, names, types
 
 
-df_all = pd.concat([df_core, df_streak, df_deceptive, df_final, df_random], ignore_index=True)
-df_all.to_csv("strategy_pool_full_min2.csv", index=False)
-df_all.head()
+# Every (type, chunk) pair gets its own SeedSequence substream, so output only
+# depends on the seed and chunk size, not on which worker ran which chunk
+def chunk_specs(counts, seed, chunk_size=CHUNK_SIZE, rules=DEFAULT_RULES):
+    root = np.random.SeedSequence(seed)
+    for strat_type, count in counts.items():
+        type_id = TYPE_ORDER.index(strat_type)
+        for c, start in enumerate(range(0, count, chunk_size)):
+            seed_seq = np.random.SeedSequence(root.entropy, spawn_key=(type_id, c))
+            yield strat_type, start, min(chunk_size, count - start), seed_seq, rules
+
+
+def generate_pool_chunks(counts=DEFAULT_COUNTS, seed=None, chunk_size=CHUNK_SIZE, workers=1, rules=DEFAULT_RULES):
+    specs = chunk_specs(counts, seed, chunk_size, rules)
+    if workers <= 1:
+        yield from map(generate_chunk, specs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep only a few chunks in flight so memory stays flat, and yield
+        # them in submission order
+        pending = deque()
+        for spec in specs:
+            pending.append(executor.submit(generate_chunk, spec))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_pool(path=POOL_CSV, counts=DEFAULT_COUNTS, seed=None, chunk_size=CHUNK_SIZE, workers=1, fmt="both",
+               rules=DEFAULT_RULES):
+    unknown = set(counts) - set(TYPE_ORDER)
+    if unknown:
+        raise ValueError(f"Unknown strategy types: {', '.join(sorted(unknown))}")
+    # The family generators place their stacks at fixed offsets from both ends
+    if rules.num_castles < MIN_POOL_CASTLES:
+        raise ValueError(f"Pools need at least {MIN_POOL_CASTLES} castles.")
+    counts = {t: c for t, c in counts.items() if c > 0}
+    columns = rules.columns
+
+    csv_file = open(path, "w", newline="") if fmt in ("csv", "both") else None
+    if csv_file is None and os.path.exists(path):
+        # A CSV left from an earlier run would be read instead of the new bundle
+        os.remove(path)
+    bundle = None
+    if fmt in ("bundle", "both"):
+        bundle = PoolBundleWriter(bundle_path(path), sum(counts.values()), sorted(counts), rules)
+
+    rows = 0
+    for strats, names, types in generate_pool_chunks(counts, seed, chunk_size, workers, rules):
+        if csv_file is not None:
+            df = pd.DataFrame(strats, columns=columns)
+            df['name'] = names
+            df['type'] = types
+            df.to_csv(csv_file, index=False, header=rows == 0)
+        if bundle is not None:
+            bundle.append(strats, names, types)
+        rows += len(strats)
+
+    if csv_file is not None:
+        csv_file.close()
+    if bundle is not None:
+        bundle.close(file_digest(path) if csv_file is not None else None)
+    return rows
+
+
+def _parse_count(text):
+    strat_type, _, count = text.partition("=")
+    if strat_type not in TYPE_ORDER or not count.isdigit():
+        raise argparse.ArgumentTypeError(f"expected TYPE=N with TYPE one of: {', '.join(TYPE_ORDER)}")
+    return strat_type, int(count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a strategy pool in fixed-size chunks.")
+    parser.add_argument("--out", default=POOL_CSV, help="output CSV (the bundle goes next to it)")
+    parser.add_argument("--format", choices=["csv", "bundle", "both"], default="both")
+    parser.add_argument("--count", type=_parse_count, action="append", default=[], metavar="TYPE=N",
+                        help="strategies of one type; repeat per type, 0 drops it")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every count")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    add_rules_arguments(parser)
+    args = parser.parse_args()
+
+    counts = {**DEFAULT_COUNTS, **dict(args.count)}
+    counts = {t: int(round(c * args.scale)) for t, c in counts.items()}
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+    rows = write_pool(args.out, counts, seed, args.chunk_size, args.workers, args.format, rules_from_args(args))
+    out = bundle_path(args.out) if args.format == "bundle" else args.out
+    print(f"Wrote {rows:,} strategies to {out} (seed {seed})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from rules import DEFAULT_RULES, make_rules
+
+BUNDLE_FORMAT = 1
+# What reading a missing, truncated or half-written bundle can raise
+BUNDLE_ERRORS = (OSError, KeyError, ValueError, EOFError)
+HEADER_FILE = "header.json"
+ALLOC_FILE = "alloc.npy"
+NAMES_FILE = "names.bin"
+NAME_OFFSETS_FILE = "name_offsets.npy"
+TYPES_FILE = "types.npy"
+# Deduplicated view of the allocations (see deduplicate), stored so every
+# process can memory-map it instead of recomputing it
+UNIQUE_FILE = "unique.npy"
+UNIQUE_COUNTS_FILE = "unique_counts.npy"
+UNIQUE_INVERSE_FILE = "unique_inverse.npy"
+# Allocations are at most the ruleset's soldier count, but the shipped pool has a -1 from
+# rounding negative weights, so they are stored signed
+ALLOC_DTYPE = np.int8
+# Rows per step when PoolBundleWriter.close deduplicates the pool
+DEDUP_CHUNK = 1 << 20
+
+
+def bundle_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".bundle"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Identifies a pool's contents: the CSV's hash, or the bundle checksum for a
+# pool written as a bundle only (pool.py --format bundle)
+def pool_digest(csv_path):
+    header_path = os.path.join(bundle_path(csv_path), HEADER_FILE)
+    if os.path.exists(csv_path) or not os.path.exists(header_path):
+        return file_digest(csv_path)
+    with open(header_path) as f:
+        return json.load(f)["checksum"]
+
+
+def _fits(strat_array):
+    info = np.iinfo(ALLOC_DTYPE)
+    return strat_array.min() >= info.min and strat_array.max() <= info.max
+
+
+def _checksum(alloc, names_blob, type_codes):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(alloc).data)
+    digest.update(names_blob)
+    digest.update(np.ascontiguousarray(type_codes).data)
+    return digest.hexdigest()
+
+
+# Pools don't record their ruleset; one as wide as the default game is taken
+# to be for it, anything else for a game with that many castles and the
+# soldiers of its first row
+def _rules_for(strat_array):
+    num_castles = strat_array.shape[1]
+    if num_castles == DEFAULT_RULES.num_castles or not len(strat_array):
+        return DEFAULT_RULES
+    return make_rules(num_castles, total_soldiers=int(strat_array[0].sum()), pool_min=0)
+
+
+def write_pool_bundle(strat_array, names, types, path, source_sha256=None, rules=None):
+    strat_array = np.asarray(strat_array)
+    types = np.asarray(types, dtype=str)
+    rules = _rules_for(strat_array) if rules is None else rules
+    writer = PoolBundleWriter(path, len(types), np.unique(types), rules)
+    writer.append(strat_array, names, types)
+    return writer.close(source_sha256)
+
+
+# Writes a bundle in row chunks so pools larger than memory can be bundled.
+# The number of rows and the type dictionary must be known up front; files
+# are built under temporary names and swapped in by close().
+class PoolBundleWriter:
+    def __init__(self, path, num_strategies, type_names, rules=DEFAULT_RULES):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.num_strategies = num_strategies
+        self.type_names = [str(t) for t in type_names]
+        self._type_index = {t: i for i, t in enumerate(self.type_names)}
+        self.rules = rules
+        self.rows = 0
+        code_dtype = np.uint8 if len(self.type_names) <= 256 else np.uint16
+        self.alloc = np.lib.format.open_memmap(
+            self._tmp(ALLOC_FILE), mode="w+", dtype=ALLOC_DTYPE, shape=(num_strategies, rules.num_castles)
+        )
+        self.type_codes = np.lib.format.open_memmap(
+            self._tmp(TYPES_FILE), mode="w+", dtype=code_dtype, shape=(num_strategies,)
+        )
+        self.offsets = np.lib.format.open_memmap(
+            self._tmp(NAME_OFFSETS_FILE), mode="w+", dtype=np.uint64, shape=(num_strategies + 1,)
+        )
+        self._names = open(self._tmp(NAMES_FILE), "wb")
+
+    def _tmp(self, name):
+        return f"{os.path.join(self.path, name)}.{os.getpid()}.tmp"
+
+    def append(self, strat_array, names, types):
+        strat_array = np.asarray(strat_array)
+        if not _fits(strat_array):
+            raise ValueError(f"Allocations must fit in {np.dtype(ALLOC_DTYPE).name} to be bundled.")
+        start, stop = self.rows, self.rows + len(strat_array)
+        if stop > self.num_strategies:
+            raise ValueError("More rows appended than the bundle was created for.")
+
+        self.alloc[start:stop] = strat_array
+        self.type_codes[start:stop] = [self._type_index[str(t)] for t in types]
+        encoded = [str(name).encode("utf-8") for name in names]
+        self.offsets[start + 1:stop + 1] = self.offsets[start] + np.cumsum([len(e) for e in encoded])
+        self._names.write(b"".join(encoded))
+        self.rows = stop
+
+    def close(self, source_sha256=None):
+        if self.rows != self.num_strategies:
+            raise ValueError(f"Bundle expects {self.num_strategies} rows, got {self.rows}.")
+        self._names.close()
+        for array in (self.alloc, self.type_codes, self.offsets):
+            array.flush()
+
+        # Same digest as _checksum, computed without loading everything at once
+        digest = hashlib.sha256()
+        for start in range(0, self.num_strategies, 1 << 20):
+            digest.update(np.ascontiguousarray(self.alloc[start:start + (1 << 20)]).data)
+        with open(self._tmp(NAMES_FILE), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(np.ascontiguousarray(self.type_codes).data)
+
+        inverse = np.lib.format.open_memmap(
+            self._tmp(UNIQUE_INVERSE_FILE), mode="w+", dtype=np.int64, shape=(self.num_strategies,)
+        )
+        unique, counts = _deduplicate_chunked(self.alloc, inverse)
+        inverse.flush()
+        del inverse
+        for name, array in ((UNIQUE_FILE, unique), (UNIQUE_COUNTS_FILE, counts)):
+            with open(self._tmp(name), "wb") as f:
+                np.save(f, array, allow_pickle=False)
+
+        header = {
+            "format": BUNDLE_FORMAT,
+            "num_strategies": self.num_strategies,
+            "num_castles": self.rules.num_castles,
+            "total_soldiers": self.rules.total_soldiers,
+            "baseline_min": self.rules.pool_min,
+            "types": self.type_names,
+            "source_sha256": source_sha256,
+            "checksum": digest.hexdigest(),
+            "num_unique": len(unique),
+        }
+        del self.alloc, self.type_codes, self.offsets
+        for name in (ALLOC_FILE, TYPES_FILE, NAME_OFFSETS_FILE, NAMES_FILE,
+                     UNIQUE_FILE, UNIQUE_COUNTS_FILE, UNIQUE_INVERSE_FILE):
+            os.replace(self._tmp(name), os.path.join(self.path, name))
+        # The header goes last: a bundle without one is treated as missing
+        _replace_file(self.path, HEADER_FILE, lambda f: f.write(json.dumps(header, indent=2).encode("utf-8")))
+        return header
+
+
+# Other processes may have the old files memory-mapped, so never rewrite a
+# bundle file in place
+def _replace_file(directory, name, write):
+    final = os.path.join(directory, name)
+    tmp = f"{final}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, final)
+
+
+def read_pool_bundle(path, source_sha256=None, verify=True):
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header["format"] != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format {header['format']}.")
+    if source_sha256 is not None and header["source_sha256"] != source_sha256:
+        raise ValueError("Bundle is stale: the source CSV has changed.")
+
+    alloc = np.load(os.path.join(path, ALLOC_FILE), mmap_mode="r")
+    if alloc.shape[1:] != (header["num_castles"],):
+        raise ValueError("Bundle allocations do not match its header.")
+    offsets = np.load(os.path.join(path, NAME_OFFSETS_FILE))
+    type_codes = np.load(os.path.join(path, TYPES_FILE))
+    with open(os.path.join(path, NAMES_FILE), "rb") as f:
+        names_blob = f.read()
+    if verify and _checksum(alloc, names_blob, type_codes) != header["checksum"]:
+        raise ValueError("Bundle checksum mismatch.")
+
+    names = np.array(
+        [names_blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())],
+        dtype=object
+    )
+    return alloc, names, type_codes, np.array(header["types"], dtype=object)
+
+
+# The deduplicated view stored with a bundle, memory-mapped read-only so all
+# processes share the same pages; None for bundles written without it
+def read_pool_dedup(path, num_strategies=None):
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if "num_unique" not in header:
+        return None
+    unique = np.load(os.path.join(path, UNIQUE_FILE), mmap_mode="r")
+    counts = np.load(os.path.join(path, UNIQUE_COUNTS_FILE), mmap_mode="r")
+    inverse = np.load(os.path.join(path, UNIQUE_INVERSE_FILE), mmap_mode="r")
+    expected = header["num_strategies"] if num_strategies is None else num_strategies
+    if len(unique) != header["num_unique"] or len(counts) != len(unique) or len(inverse) != expected:
+        raise ValueError("Bundle deduplication files do not match the header.")
+    return unique, counts, inverse
+
+
+# Unique allocation rows, how many pool entries share each one, and for every
+# pool entry the index of its unique row (names[inverse == u] are the names
+# behind unique row u)
+def deduplicate(strat_array):
+    unique, inverse, counts = np.unique(
+        np.asarray(strat_array), axis=0, return_inverse=True, return_counts=True
+    )
+    return unique, counts, inverse.reshape(-1)
+
+
+# Opponents are the distinct allocations; each row of the returned matrix
+# counts how many pool entries of every type share that allocation (float64,
+# so matmuls against it stay exact for any realistic multiplicity)
+def opponent_types(strat_array, type_codes, num_types):
+    unique, _, inverse = deduplicate(strat_array)
+    onehot = np.zeros((len(unique), num_types), dtype=np.float64)
+    np.add.at(onehot, (inverse, type_codes), 1)
+    return unique, inverse, onehot
+
+
+# Each row as one byte string whose byte order sorts like the row itself:
+# flipping the sign bit maps ALLOC_DTYPE (int8) onto unsigned bytes in order
+def _row_keys(rows):
+    packed = np.ascontiguousarray(rows, dtype=ALLOC_DTYPE).view(np.uint8) ^ 0x80
+    return packed.view(np.dtype((np.void, packed.shape[1]))).reshape(-1)
+
+
+# deduplicate for pools too large to sort in memory: the distinct rows are
+# gathered a chunk at a time and the inverse is written into `inverse` (a
+# memmap), so memory follows the number of distinct rows, not the pool size.
+# Rows, order and counts match deduplicate.
+def _deduplicate_chunked(alloc, inverse, chunk=DEDUP_CHUNK):
+    num_castles = alloc.shape[1]
+    keys = np.empty(0, dtype=np.dtype((np.void, num_castles)))
+    for start in range(0, len(alloc), chunk):
+        keys = np.union1d(keys, _row_keys(alloc[start:start + chunk]))
+    counts = np.zeros(len(keys), dtype=np.int64)
+    for start in range(0, len(alloc), chunk):
+        index = np.searchsorted(keys, _row_keys(alloc[start:start + chunk]))
+        inverse[start:start + len(index)] = index
+        seen, seen_counts = np.unique(index, return_counts=True)
+        counts[seen] += seen_counts
+    unique = np.frombuffer(keys, dtype=np.uint8).reshape(len(keys), num_castles) ^ 0x80
+    return unique.view(ALLOC_DTYPE), counts
+
+
+# Deduplicated view of a pool returned by load_pool: memory-mapped from its
+# bundle when it has one, computed in memory otherwise
+def load_pool_dedup(csv_path, strat_array):
+    path = bundle_path(csv_path)
+    if isinstance(strat_array, np.memmap):
+        try:
+            dedup = read_pool_dedup(path, len(strat_array))
+            if dedup is not None:
+                return dedup
+        except BUNDLE_ERRORS:
+            pass
+    return deduplicate(strat_array)
+
+
+def read_pool_csv(csv_path):
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    num_castles = sum(1 for c in df.columns if re.fullmatch(r"C\d+", c))
+    strat_array = df[[f"C{i}" for i in range(1, num_castles + 1)]].values
+    type_names, type_codes = np.unique(df["type"].values, return_inverse=True)
+    return strat_array, df["name"].values, type_codes, type_names
+
+
+# Prefers the binary bundle next to the CSV and falls back to parsing the CSV,
+# refreshing the bundle on the way when it is missing or stale. A bundle
+# without its CSV is the pool itself and is read as is.
+def load_pool(csv_path, write_bundle=True):
+    path = bundle_path(csv_path)
+    source_sha256 = file_digest(csv_path) if os.path.exists(csv_path) else None
+    if os.path.exists(os.path.join(path, HEADER_FILE)):
+        try:
+            return read_pool_bundle(path, source_sha256)
+        except BUNDLE_ERRORS:
+            if source_sha256 is None:
+                raise
+            # Rebuilt from the CSV below
+
+    strat_array, names, type_codes, type_names = read_pool_csv(csv_path)
+    if _fits(strat_array):
+        strat_array = strat_array.astype(ALLOC_DTYPE)
+    if write_bundle:
+        try:
+            write_pool_bundle(strat_array, names, type_names[type_codes], path, source_sha256)
+        except (OSError, ValueError):
+            pass
+    return strat_array, names, type_codes, type_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a strategy pool CSV into a binary bundle.")
+    parser.add_argument("csv", help="strategy pool CSV")
+    parser.add_argument("--out", default=None, help="bundle directory (default: next to the CSV)")
+    args = parser.parse_args()
+
+    strat_array, names, type_codes, type_names = read_pool_csv(args.csv)
+    out = args.out or bundle_path(args.csv)
+    header = write_pool_bundle(strat_array, names, type_names[type_codes], out, file_digest(args.csv))
+    print(f"Wrote {header['num_strategies']} strategies to {out}")
+
+
+if __name__ == "__main__":
+    main()
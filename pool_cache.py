@@ -0,0 +1,61 @@
+import threading
+
+from metrics import timed
+
+POOL_CSV = "strategy_pool_full_min2.csv"
+
+_pools = {}
+_threads = {}
+_lock = threading.Lock()
+
+
+# numpy and the scoring tables are imported here rather than at module level,
+# so main.py can start the warm-up before paying for them
+def _load(csv_path):
+    from pool_bundle import load_pool, load_pool_dedup, pool_digest
+
+    strat_array, names, type_codes, type_names = load_pool(csv_path)
+    unique, counts, inverse = load_pool_dedup(csv_path, strat_array)
+    return {
+        "strat_array": strat_array,
+        "names": names,
+        "type_codes": type_codes,
+        "type_names": type_names,
+        "unique": unique,
+        "counts": counts,
+        "inverse": inverse,
+        "key": pool_digest(csv_path),
+    }
+
+
+def _warm(csv_path):
+    try:
+        with timed("pool.warmup"):
+            pool = _load(csv_path)
+    except Exception:
+        # get_pool retries in the foreground and surfaces the error there
+        return
+    with _lock:
+        _pools[csv_path] = pool
+
+
+# Starts loading the pool on a daemon thread, at most once per process, so it
+# is ready by the time Practice Mode is opened
+def start_pool_warmup(csv_path=POOL_CSV):
+    with _lock:
+        if csv_path in _pools or csv_path in _threads:
+            return
+        thread = _threads[csv_path] = threading.Thread(target=_warm, args=(csv_path,), daemon=True)
+    thread.start()
+
+
+# The loaded pool, waiting for a warm-up in progress or loading it now
+def get_pool(csv_path=POOL_CSV):
+    with _lock:
+        thread = _threads.get(csv_path)
+    if thread is not None:
+        thread.join()
+    with _lock:
+        if csv_path not in _pools:
+            _pools[csv_path] = _load(csv_path)
+        return _pools[csv_path]
@@ -1,74 +1,251 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-from match_utils import play_full_match, NUM_CASTLES
+from match_utils import play_full_match
+from rules import DEFAULT_RULES, validate_allocation
+from scoring import tally
+from payoff import load_summaries
+from optimizer import search_best_response, move_sensitivity
+from incremental import evaluate_incremental
+from eval_cache import EvalCache
+from pool_cache import POOL_CSV, get_pool
+from montecarlo import start_background_estimate
+from equilibrium import fictitious_play
+from metrics import timed
+
+# One read-only pool object per process shared by every session (no copies);
+# with a bundle on disk the arrays are memory-mapped, so server processes
+# share the same pages too
+@st.cache_resource
+def load_shared_pool():
+    with timed("practice.load_strategy_pool"):
+        return get_pool(POOL_CSV)
+
+shared_pool = load_shared_pool()
+strategy_pool, strategy_names = shared_pool["strat_array"], shared_pool["names"]
+# Each distinct allocation is scored once and its result counted once per
+# pool entry that shares it
+unique_pool, unique_counts, unique_inverse = shared_pool["unique"], shared_pool["counts"], shared_pool["inverse"]
+strategy_pool_key = shared_pool["key"]
+
+@st.cache_resource
+def get_eval_cache(pool_hash, rules):
+    return EvalCache(pool_hash, rules)
 
 @st.cache_data
-def load_strategy_pool():
-    df = pd.read_csv("strategy_pool_full_min2.csv")
-    strat_array = df[[f"C{i}" for i in range(1, 11)]].values
-    names = df["name"].values
-    return strat_array, names
+def load_pool_leaderboard():
+    return load_summaries()
+
+def show_pool_leaderboard():
+    leaderboard, type_matrix = load_pool_leaderboard()
+    if leaderboard is None:
+        return
+    with st.expander("🏅 Pool Leaderboard (every strategy vs the rest of the pool)"):
+        st.dataframe(leaderboard.head(100), use_container_width=True)
+        st.markdown("**Type vs type win rate** (row type against column type)")
+        st.dataframe(
+            type_matrix.pivot(index="type", columns="opponent_type", values="win_rate").style.format("{:.2f}"),
+            use_container_width=True
+        )
+
+def show_strategy_search(rules):
+    with st.expander("🧭 Find Me a Strong Strategy"):
+        st.markdown(f"Search allocations of {rules.total_soldiers} soldiers for the one that beats the most pool strategies.")
+        col1, col2, col3 = st.columns(3)
+        iterations = col1.number_input("Candidates to try", 10_000, 2_000_000, 200_000, step=10_000)
+        restarts = col2.number_input("Random restarts", 1, 20, 4)
+        # Leave at least one soldier free to move
+        max_floor = max((rules.total_soldiers - 1) // rules.num_castles, rules.min_per_castle)
+        min_per_castle = col3.number_input("Minimum per castle", rules.min_per_castle, max_floor, rules.min_per_castle)
+
+        if st.button("🔍 Search"):
+            progress = st.progress(0.0)
+            st.session_state.search_result = search_best_response(
+                unique_pool, iterations=int(iterations), restarts=int(restarts),
+                min_per_castle=int(min_per_castle), progress=progress.progress, weights=unique_counts, rules=rules
+            )
+            progress.empty()
+
+        result = st.session_state.get("search_result")
+        if result and result["rules"] == rules:
+            st.markdown(f"Tried **{result['candidates']:,}** candidates in {result['seconds']:.1f}s.")
+            best = pd.DataFrame([
+                {"Strategy": ",".join(map(str, r["allocation"])), "Wins": r["wins"], "Draws": r["draws"], "Losses": r["losses"]}
+                for r in result["best"]
+            ])
+            st.dataframe(best, use_container_width=True)
+            if result["history"]:
+                history = pd.DataFrame(result["history"])
+                st.line_chart(history, x="candidates", y=["current_wins", "best_wins"])
+
+            chosen = st.selectbox("Try one of them:", best["Strategy"])
+            if st.button("Use this strategy"):
+                st.session_state.user_input = chosen
+                st.rerun()
+
+def show_random_strength(user_strategy, rules):
+    with st.expander("🎲 Strength Against Every Possible Allocation"):
+        st.markdown(
+            f"Estimate how this strategy does against opponents drawn uniformly from all ways to split "
+            f"{rules.total_soldiers} soldiers."
+        )
+        col1, col2 = st.columns(2)
+        use_floor = col1.checkbox(f"Opponents keep at least {rules.pool_min} soldiers per castle")
+        ci_width = col2.select_slider("Confidence-interval width", [0.02, 0.01, 0.005, 0.002, 0.001], value=0.005)
+
+        job = st.session_state.get("mc_job")
+        if st.button("▶️ Start estimate"):
+            if job and job["status"] == "running":
+                job["stop"].set()
+            job = st.session_state.mc_job = start_background_estimate(
+                user_strategy, min_per_castle=rules.pool_min if use_floor else 0, ci_width=ci_width, rules=rules
+            )
 
-strategy_pool, strategy_names = load_strategy_pool()
-CASTLE_VALUES = np.arange(1, NUM_CASTLES + 1)
+        if not job or job["strategy"] != tuple(int(v) for v in user_strategy) or job["settings"].get("rules") != rules:
+            return
+        summary = job["summary"]
+        if summary:
+            st.dataframe(pd.DataFrame({
+                "Result": ["Win", "Draw", "Loss"],
+                "Rate": [summary["win_rate"], summary["draw_rate"], summary["loss_rate"]],
+                "± (95%)": [summary["win_error"], summary["draw_error"], summary["loss_error"]],
+            }).style.format({"Rate": "{:.4f}", "± (95%)": "{:.4f}"}), use_container_width=True)
+            st.caption(f"{summary['samples']:,} random opponents in {summary['seconds']:.1f}s — {job['status']}.")
+        else:
+            st.caption(f"Estimate {job['status']}...")
+        if job["status"] == "running":
+            col1, col2 = st.columns(2)
+            col1.button("🔄 Refresh")
+            if col2.button("⏹ Stop"):
+                job["stop"].set()
 
-def practice_mode():
+def show_equilibrium(user_strategy, rules):
+    with st.expander("⚖️ Stable Mixture of Pool Strategies"):
+        st.markdown("Fictitious play over the pool: which mixture of strategies can no pool strategy exploit?")
+        col1, col2 = st.columns(2)
+        iterations = col1.number_input("Fictitious-play iterations", 100, 20_000, 2000, step=100)
+        include_user = col2.checkbox("Include my strategy", value=True)
+
+        if st.button("⚖️ Solve"):
+            st.session_state.equilibrium = fictitious_play(
+                strategy_pool, int(iterations), user_strategy=user_strategy if include_user else None, rules=rules
+            )
+
+        result = st.session_state.get("equilibrium")
+        if not result or result["rules"] != rules:
+            return
+        names = strategy_names if result["user_index"] is None else np.append(strategy_names, "Your strategy")
+        top = np.argsort(-result["weights"])[:15]
+        top = top[result["weights"][top] > 0]
+        st.dataframe(pd.DataFrame({
+            "Strategy": [",".join(map(str, result["unique"][u])) for u in top],
+            "Example": [names[result["inverse"] == u][0] for u in top],
+            "Weight": result["weights"][top],
+        }), use_container_width=True)
+        history = pd.DataFrame(result["history"])
+        st.line_chart(history, x="iteration", y="exploitability")
+        st.markdown(
+            f"Exploitability **{history['exploitability'].iloc[-1]:.4f}**; best pool response: "
+            f"**{','.join(map(str, result['unique'][result['best_response']]))}**"
+        )
+        if result["user_index"] is not None:
+            st.markdown(f"Your strategy scores **{result['payoffs'][result['user_index']]:+.3f}** against the mixture.")
+
+def show_move_sensitivity(user_strategy, rules):
+    st.markdown("**🔀 Moving one soldier from castle i (row) to castle j (column)**")
+    metric = st.radio("Change in", ["Wins", "Draws", "Losses"], horizontal=True, key="sensitivity_metric")
+    with timed("practice.move_sensitivity"):
+        sensitivity = move_sensitivity(user_strategy, unique_pool, unique_counts, rules=rules)
+    delta = sensitivity[metric.lower()]
+    labels = rules.columns
+    table = pd.DataFrame(delta, index=[f"from {c}" for c in labels], columns=[f"to {c}" for c in labels])
+    # Fewer losses is the improvement, so that colour scale is flipped
+    cmap = "RdYlGn_r" if metric == "Losses" else "RdYlGn"
+    limit = max(np.nanmax(np.abs(delta)), 1)
+    st.dataframe(
+        table.style.background_gradient(cmap=cmap, axis=None, vmin=-limit, vmax=limit).format("{:+.0f}", na_rep=""),
+        use_container_width=True
+    )
+    wins = sensitivity["wins"]
+    i, j = np.unravel_index(np.nanargmax(wins), wins.shape)
+    st.caption(f"Best single move: one soldier from castle {i+1} to castle {j+1} ({wins[i, j]:+.0f} wins).")
+
+def practice_mode(rules=DEFAULT_RULES):
     st.title("🎯 Practice Against the Strategy Pool")
-    st.markdown("Enter your own strategy and see how it performs against 10,000 opponents!")
+    # The pool is generated for one game; a ruleset with a different board
+    # needs its own (python pool.py with the same rule options)
+    if strategy_pool.shape[1] != rules.num_castles or int(strategy_pool[0].sum()) != rules.total_soldiers:
+        st.warning(
+            f"The strategy pool was generated for {strategy_pool.shape[1]} castles and "
+            f"{int(strategy_pool[0].sum())} soldiers, so it can't be used with these rules ({rules.describe()})."
+        )
+        return
+    st.markdown(f"Enter your own strategy and see how it performs against {len(strategy_pool):,} opponents!")
+    st.caption(f"Rules: {rules.describe()}.")
+    # payoff.py precomputes the leaderboard under the standard rules
+    if rules == DEFAULT_RULES:
+        show_pool_leaderboard()
+    show_strategy_search(rules)
 
     user_input = st.text_input(
-        "Enter your strategy as 10 comma-separated integers that sum to 100:",
+        f"Enter your strategy as {rules.num_castles} comma-separated integers that sum to {rules.total_soldiers}:",
         value=st.session_state.get("user_input", "")
     )
 
     if user_input:
         try:
             user_strategy = np.array([int(x.strip()) for x in user_input.split(',')])
-            if len(user_strategy) != 10:
-                st.error("Your strategy must have exactly 10 numbers.")
-            elif user_strategy.sum() != 100:
-                st.error(f"Your strategy sums to {user_strategy.sum()}, but it must sum to 100.")
-            elif np.any(user_strategy < 0):
-                st.error("All numbers must be non-negative.")
+            error = validate_allocation(user_strategy, rules)
+            if error:
+                st.error(f"Invalid strategy: {error}.")
             else:
                 st.session_state.user_input = user_input
                 st.success("Valid strategy submitted. Evaluating...")
 
-                def apply_3strike(you, them):
-                    y_score = t_score = streak_y = streak_t = 0
-                    for i in range(NUM_CASTLES):
-                        if you[i] > them[i]:
-                            y_score += CASTLE_VALUES[i]
-                            streak_y += 1
-                            streak_t = 0
-                        elif them[i] > you[i]:
-                            t_score += CASTLE_VALUES[i]
-                            streak_t += 1
-                            streak_y = 0
-                        else:
-                            streak_y = streak_t = 0
-                        if streak_y == 3:
-                            y_score += CASTLE_VALUES[i+1:].sum()
-                            break
-                        if streak_t == 3:
-                            t_score += CASTLE_VALUES[i+1:].sum()
-                            break
-                    return y_score, t_score
-
-                scores = np.array([apply_3strike(user_strategy, opp) for opp in strategy_pool])
-                user_total = scores[:, 0]
-                oppo_total = scores[:, 1]
-
-                wins = user_total > oppo_total
-                losses = user_total < oppo_total
-                draws = user_total == oppo_total
-
-                st.markdown(f"✅ **Wins:** {wins.sum()} / {len(strategy_pool)}")
-                st.markdown(f"❌ **Losses:** {losses.sum()} / {len(strategy_pool)}")
-                st.markdown(f"➖ **Draws:** {draws.sum()} / {len(strategy_pool)}")
-
-                if losses.sum() > 0:
+                # Scores depend on the rules as well as the pool
+                eval_cache = get_eval_cache(strategy_pool_key, rules)
+                with timed("practice.cache_lookup"):
+                    cached = eval_cache.get(user_strategy)
+                if cached is None:
+                    # Keep per-opponent state between reruns so small edits only
+                    # rescore the opponents whose result can change
+                    with timed("practice.evaluate"):
+                        st.session_state.pool_eval = evaluate_incremental(
+                            st.session_state.get("pool_eval"), user_strategy, unique_pool, strategy_pool_key, rules
+                        )
+                    unique_user = st.session_state.pool_eval["you"]
+                    unique_oppo = st.session_state.pool_eval["them"]
+                    with timed("practice.cache_store"):
+                        eval_cache.put(user_strategy, unique_user, unique_oppo)
+                    st.caption(
+                        f"Rescored {st.session_state.pool_eval['rescored']:,} of "
+                        f"{len(unique_pool):,} distinct opponent allocations."
+                    )
+                else:
+                    unique_user, unique_oppo = cached
+                stats = eval_cache.stats()
+                st.caption(
+                    f"Evaluation cache: {stats['memory_hits']} memory hits, "
+                    f"{stats['disk_hits']} disk hits, {stats['misses']} misses."
+                )
+
+                with timed("practice.tally"):
+                    win_total, draw_total, loss_total = tally(unique_user, unique_oppo, unique_counts)
+                    user_total = unique_user[unique_inverse]
+                    oppo_total = unique_oppo[unique_inverse]
+                    losses = user_total < oppo_total
+
+                col_results, col_moves = st.columns([1, 2])
+                with col_results:
+                    st.markdown(f"✅ **Wins:** {win_total} / {len(strategy_pool)}")
+                    st.markdown(f"❌ **Losses:** {loss_total} / {len(strategy_pool)}")
+                    st.markdown(f"➖ **Draws:** {draw_total} / {len(strategy_pool)}")
+                with col_moves:
+                    show_move_sensitivity(user_strategy, rules)
+                show_random_strength(user_strategy, rules)
+                show_equilibrium(user_strategy, rules)
+
+                if loss_total > 0:
                     st.markdown("### 😓 Sample Strategies You Lost Against:")
 
                     loss_indices = np.where(losses)[0]
@@ -92,10 +269,11 @@ def practice_mode():
                     if len(filtered_losses) == 0:
                         st.warning("All samples turned out to be ties or wins. Try reloading.")
                     else:
-                        df = pd.DataFrame(strategy_pool[filtered_losses], columns=[f"C{i+1}" for i in range(NUM_CASTLES)])
-                        df.insert(0, "Strategy Name", strategy_names[filtered_losses])
-                        df["Opponent Score"] = oppo_total[filtered_losses]
-                        df["Your Score"] = user_total[filtered_losses]
+                        with timed("practice.loss_table"):
+                            df = pd.DataFrame(strategy_pool[filtered_losses], columns=rules.columns)
+                            df.insert(0, "Strategy Name", strategy_names[filtered_losses])
+                            df["Opponent Score"] = oppo_total[filtered_losses]
+                            df["Your Score"] = user_total[filtered_losses]
                         st.dataframe(df)
 
                         st.markdown("---")
@@ -112,7 +290,8 @@ def practice_mode():
                                 user_strategy,
                                 strategy_pool[filtered_losses[replay_idx]],
                                 p1="You",
-                                p2=strategy_names[filtered_losses[replay_idx]]
+                                p2=strategy_names[filtered_losses[replay_idx]],
+                                rules=rules
                             )
 
         except ValueError:
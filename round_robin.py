@@ -0,0 +1,75 @@
+import numpy as np
+
+from rules import DEFAULT_RULES
+from scoring import score
+
+
+# Every strategy of every player against every strategy of every other
+# player in one vectorized pass: scores[i, j, a, b] is player i playing
+# strategy a against player j playing strategy b
+def pairing_scores(strategies, rules=DEFAULT_RULES):
+    strategies = np.asarray(strategies)
+    you, them = score(strategies[:, None, :, None, :], strategies[None, :, None, :, :], rules)
+    return you.astype(np.int32), them.astype(np.int32)
+
+
+def _pairing(a, b, s1, s2):
+    return {"Strategy 1": int(a) + 1, "Strategy 2": int(b) + 1, "Score 1": int(s1), "Score 2": int(s2)}
+
+
+# Scores only the given (i, j) player pairs: scores[k, a, b] is pairs[k][0]
+# playing strategy a against pairs[k][1] playing strategy b
+def pair_scores(strategies, pairs, rules=DEFAULT_RULES):
+    strategies, pairs = np.asarray(strategies), np.asarray(pairs).reshape(-1, 2)
+    you, them = score(strategies[pairs[:, 0], :, None, :], strategies[pairs[:, 1], None, :, :], rules)
+    return you.astype(np.int32), them.astype(np.int32)
+
+
+# One match dict in the format tournament_mode records, from the
+# (strategies x strategies) scores of Player 1 and Player 2
+def _match(p1, p2, s1, s2):
+    num_strategies = s1.shape[0]
+    match = {"Player 1": p1, "Player 2": p2}
+    if num_strategies == 1:
+        match["Score 1"], match["Score 2"] = int(s1[0, 0]), int(s2[0, 0])
+    else:
+        match["Score 1"] = round(float(s1.mean()), 2)
+        match["Score 2"] = round(float(s2.mean()), 2)
+        # Margin first, Player 1's own score breaks ties
+        key = (s1 - s2) * 1000 + s1
+        best = np.unravel_index(np.argmax(key), key.shape)
+        worst = np.unravel_index(np.argmin(key), key.shape)
+        match["Best"] = _pairing(*best, s1[best], s2[best])
+        match["Worst"] = _pairing(*worst, s1[worst], s2[worst])
+    match["Pairings"] = [
+        _pairing(a, b, s1[a, b], s2[a, b]) for a in range(num_strategies) for b in range(num_strategies)
+    ]
+    return match
+
+
+# Plays every pair of players once, without animation, and returns match
+# dicts in the same format as tournament_mode. Players with fewer than
+# `num_strategies` strategies sit out. With several strategies per player the
+# scores are the expected result over all pairings, and the best and worst
+# pairing for Player 1 are kept alongside every pairing played.
+def score_round_robin(players, num_strategies=1, rules=DEFAULT_RULES):
+    names = [p for p, s in players.items() if len(s) >= num_strategies]
+    if len(names) < 2:
+        return []
+    strategies = np.array([players[p][:num_strategies] for p in names])
+    you, them = pairing_scores(strategies, rules)
+    return [
+        dict(_match(names[i], names[j], you[i, j], them[i, j]), Auto=True)
+        for i, j in zip(*np.triu_indices(len(names), k=1))
+    ]
+
+
+# The same match dicts for chosen (name, name) pairs only, e.g. a Swiss round
+def score_pairs(players, pairs, num_strategies=1, rules=DEFAULT_RULES):
+    if not pairs:
+        return []
+    names = sorted({p for pair in pairs for p in pair})
+    index = {p: k for k, p in enumerate(names)}
+    strategies = np.array([players[p][:num_strategies] for p in names])
+    you, them = pair_scores(strategies, [(index[p1], index[p2]) for p1, p2 in pairs], rules)
+    return [_match(p1, p2, you[k], them[k]) for k, (p1, p2) in enumerate(pairs)]
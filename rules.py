@@ -0,0 +1,116 @@
+from collections import namedtuple
+
+# Scoring tables have 3 ** num_castles entries: about 1 MB for 10 castles,
+# 24 MB and a one-second build for 13
+MAX_CASTLES = 13
+
+_FIELDS = ("num_castles", "castle_values", "total_soldiers", "min_per_castle",
+           "streak_length", "streak_awards_rest", "pool_min")
+
+
+# One variant of the game. Castle i is worth castle_values[i]; a legal
+# allocation puts total_soldiers soldiers in all and at least min_per_castle
+# in every castle. Winning streak_length castles in a row ends the match and,
+# with streak_awards_rest, also wins every castle not yet played
+# (streak_length=None turns the rule off). pool_min is the floor used when
+# generating strategy pools. Rulesets are immutable and hashable, so the
+# scoring tables built for one (scoring.kernels) are cached per ruleset.
+class Ruleset(namedtuple("Ruleset", _FIELDS)):
+    __slots__ = ()
+
+    @property
+    def columns(self):
+        return [f"C{i}" for i in range(1, self.num_castles + 1)]
+
+    # Stable text form, for cache keys and file headers
+    @property
+    def key(self):
+        values = ",".join(map(str, self.castle_values))
+        streak = f"{self.streak_length}{'+rest' if self.streak_awards_rest else ''}" if self.streak_length else "off"
+        return (f"castles={self.num_castles};values={values};soldiers={self.total_soldiers};"
+                f"min={self.min_per_castle};streak={streak};pool_min={self.pool_min}")
+
+    def describe(self):
+        parts = [f"{self.num_castles} castles", f"{self.total_soldiers} soldiers"]
+        if self.castle_values != tuple(range(1, self.num_castles + 1)):
+            parts.append(f"values {', '.join(map(str, self.castle_values))}")
+        if self.min_per_castle:
+            parts.append(f"at least {self.min_per_castle} per castle")
+        if self.streak_length is None:
+            parts.append("no streak rule")
+        else:
+            parts.append(f"{self.streak_length}-strike rule"
+                         + (" (takes the remaining castles)" if self.streak_awards_rest else " (ends the match)"))
+        return ", ".join(parts)
+
+
+def make_rules(num_castles=10, castle_values=None, total_soldiers=100, min_per_castle=0,
+               streak_length=3, streak_awards_rest=True, pool_min=2):
+    if castle_values is None:
+        castle_values = range(1, num_castles + 1)
+    castle_values = tuple(int(v) for v in castle_values)
+    if not 1 <= num_castles <= MAX_CASTLES:
+        raise ValueError(f"Between 1 and {MAX_CASTLES} castles are supported.")
+    if len(castle_values) != num_castles:
+        raise ValueError(f"Expected {num_castles} castle values, got {len(castle_values)}.")
+    if any(v < 0 for v in castle_values):
+        raise ValueError("Castle values must be non-negative.")
+    if num_castles * max(min_per_castle, pool_min) > total_soldiers:
+        raise ValueError("Minimum allocation exceeds total soldier count.")
+    if streak_length is not None and not 1 <= streak_length <= num_castles:
+        raise ValueError(f"Streak length must be between 1 and {num_castles}.")
+    return Ruleset(num_castles, castle_values, total_soldiers, min_per_castle,
+                   streak_length, bool(streak_awards_rest), pool_min)
+
+
+DEFAULT_RULES = make_rules()
+
+# Ready-made variants offered in the app
+VARIANTS = {
+    "Standard": DEFAULT_RULES,
+    "4-strike rule": make_rules(streak_length=4),
+    "Streak ends the match (no bonus)": make_rules(streak_awards_rest=False),
+    "No streak rule": make_rules(streak_length=None),
+    "12 castles, 4-strike rule": make_rules(12, streak_length=4),
+}
+
+
+# The reason `values` is not a legal allocation, or None
+def validate_allocation(values, rules=DEFAULT_RULES):
+    values = [int(v) for v in values]
+    if len(values) != rules.num_castles:
+        return f"expected {rules.num_castles} numbers, got {len(values)}"
+    if any(v < 0 for v in values):
+        return "all numbers must be non-negative"
+    if any(v < rules.min_per_castle for v in values):
+        return f"every castle needs at least {rules.min_per_castle} soldiers"
+    if sum(values) != rules.total_soldiers:
+        return f"sums to {sum(values)}, not {rules.total_soldiers}"
+    return None
+
+
+def add_rules_arguments(parser):
+    group = parser.add_argument_group("game rules")
+    group.add_argument("--castles", type=int, default=DEFAULT_RULES.num_castles)
+    group.add_argument("--values", default=None, help="comma-separated castle values (default: 1..castles)")
+    group.add_argument("--soldiers", type=int, default=DEFAULT_RULES.total_soldiers)
+    group.add_argument("--min-per-castle-rule", type=int, default=DEFAULT_RULES.min_per_castle,
+                       help="fewest soldiers a legal allocation may put in a castle")
+    group.add_argument("--streak", type=int, default=DEFAULT_RULES.streak_length, help="0 turns the streak rule off")
+    group.add_argument("--streak-no-bonus", action="store_true",
+                       help="a streak ends the match without winning the remaining castles")
+    group.add_argument("--pool-min", type=int, default=DEFAULT_RULES.pool_min,
+                       help="floor per castle when generating pools")
+    return group
+
+
+def rules_from_args(args):
+    return make_rules(
+        args.castles,
+        [int(v) for v in args.values.split(",")] if args.values else None,
+        args.soldiers,
+        args.min_per_castle_rule,
+        args.streak or None,
+        not args.streak_no_bonus,
+        args.pool_min,
+    )
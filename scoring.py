@@ -0,0 +1,142 @@
+from functools import lru_cache
+
+import numpy as np
+
+from rules import DEFAULT_RULES
+
+# Each castle comparison is a base-3 digit: 0 = loss, 1 = draw, 2 = win.
+LOSS, DRAW, WIN = 0, 1, 2
+
+
+# Everything the vectorized scorers need for one ruleset: the weight of each
+# castle's digit in an outcome code, and per code the final scores, how many
+# castles were played, who triggered the streak rule (0 = nobody, 1 = you,
+# 2 = them), the result (+1 / 0 / -1), the result packed as wins << 32 plus
+# draws, and the score margin
+class Kernels:
+    def __init__(self, rules):
+        self.rules = rules
+        self.castle_values = np.array(rules.castle_values, dtype=np.int64)
+        self.powers = 3 ** np.arange(rules.num_castles, dtype=np.int32)
+        self.num_codes = 3 ** rules.num_castles
+        self.outcome_table, self.stop_table, self.strike_table = self._build_outcome_table()
+        you, them = self.outcome_table[:, 0].astype(np.int64), self.outcome_table[:, 1].astype(np.int64)
+        self.result_table = np.sign(you - them).astype(np.int8)
+        self.packed_table = np.where(self.result_table > 0, 1 << 32, 0).astype(np.int64) + (self.result_table == 0)
+        self.margin_table = (you - them).astype(np.int8 if self.castle_values.sum() <= 127 else np.int32)
+        # Smallest dtype that holds any outcome code
+        self.code_dtype = np.uint16 if self.num_codes <= 1 << 16 else np.int32
+
+    def _build_outcome_table(self):
+        rules, values = self.rules, self.castle_values
+        num_castles, num_codes = rules.num_castles, self.num_codes
+        codes = np.arange(num_codes, dtype=np.int32)
+        score_dtype = np.int16 if values.sum() <= np.iinfo(np.int16).max else np.int32
+        scores = np.zeros((num_codes, 2), dtype=score_dtype)
+        # Number of castles resolved before the game ended (all of them if
+        # nobody completed a streak)
+        stop = np.full(num_codes, num_castles, dtype=np.int8)
+        striker = np.zeros(num_codes, dtype=np.int8)
+        streak_y = np.zeros(num_codes, dtype=np.int8)
+        streak_t = np.zeros(num_codes, dtype=np.int8)
+        live = np.ones(num_codes, dtype=bool)
+        remaining = np.append(values[::-1].cumsum()[::-1], 0)
+
+        for i in range(num_castles):
+            digit = codes // self.powers[i] % 3
+            win = live & (digit == WIN)
+            loss = live & (digit == LOSS)
+            draw = live & (digit == DRAW)
+            scores[win, 0] += values[i]
+            scores[loss, 1] += values[i]
+            if rules.streak_length is None:
+                continue
+            streak_y = np.where(win, streak_y + 1, 0)
+            streak_t = np.where(loss, streak_t + 1, 0)
+            streak_y[draw] = streak_t[draw] = 0
+
+            bonus = remaining[i + 1] if rules.streak_awards_rest else 0
+            strike_y = live & (streak_y == rules.streak_length)
+            strike_t = live & (streak_t == rules.streak_length)
+            scores[strike_y, 0] += bonus
+            scores[strike_t, 1] += bonus
+            stop[strike_y | strike_t] = i + 1
+            striker[strike_y] = 1
+            striker[strike_t] = 2
+            live &= ~(strike_y | strike_t)
+
+        return scores, stop, striker
+
+
+# Built on first use and kept for the life of the process, one entry per
+# ruleset played, so a variant costs one table build and then scores at the
+# same speed as the standard game
+@lru_cache(maxsize=None)
+def kernels(rules=DEFAULT_RULES):
+    return Kernels(rules)
+
+
+def castle_digits(you, them):
+    you = np.asarray(you)
+    them = np.asarray(them)
+    return (you > them).astype(np.int8) - (you < them) + DRAW
+
+
+def outcome_codes(you, them, rules=DEFAULT_RULES):
+    return castle_digits(you, them).astype(np.int32) @ kernels(rules).powers
+
+
+# Broadcasts over leading axes (castles on the last axis), so one strategy
+# can be scored against a whole (N, castles) pool in a single pass.
+def score(you, them, rules=DEFAULT_RULES):
+    table = kernels(rules).outcome_table[outcome_codes(you, them, rules)]
+    return table[..., 0], table[..., 1]
+
+
+# With `weights` (e.g. multiplicities of deduplicated pool rows) each result
+# counts that many times
+def tally(you_scores, them_scores, weights=None):
+    if weights is None:
+        weights = np.ones(len(you_scores), dtype=np.int64)
+    wins = int(weights[you_scores > them_scores].sum())
+    draws = int(weights[you_scores == them_scores].sum())
+    losses = int(weights[you_scores < them_scores].sum())
+    return wins, draws, losses
+
+
+# Castle-by-castle account of one match for replays: who won each castle,
+# the running scores and win streaks, and where the streak rule ended it.
+# Only plain ints and strings, so it can be sent to the browser as JSON.
+def match_trace(s1, s2, rules=DEFAULT_RULES):
+    k = kernels(rules)
+    digits = castle_digits(s1, s2)
+    code = int(digits.astype(np.int32) @ k.powers)
+    stop, striker = int(k.stop_table[code]), int(k.strike_table[code])
+    score1 = score2 = streak1 = streak2 = 0
+    castles = []
+    for i in range(stop):
+        value = int(k.castle_values[i])
+        if digits[i] == WIN:
+            score1, streak1, streak2, winner = score1 + value, streak1 + 1, 0, 1
+        elif digits[i] == LOSS:
+            score2, streak1, streak2, winner = score2 + value, 0, streak2 + 1, 2
+        else:
+            streak1 = streak2 = winner = 0
+        castles.append({
+            "castle": i + 1,
+            "value": value,
+            "soldiers": [int(s1[i]), int(s2[i])],
+            "winner": winner,
+            "scores": [score1, score2],
+            "streaks": [streak1, streak2],
+        })
+    final = [int(x) for x in k.outcome_table[code]]
+    return {
+        "castles": castles,
+        "stop": stop,
+        "striker": striker,
+        "streak_length": rules.streak_length,
+        # Value of the unplayed castles awarded to the striker
+        "bonus": final[striker - 1] - castles[-1]["scores"][striker - 1] if striker else 0,
+        "final": final,
+    }
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+
+from rules import DEFAULT_RULES, add_rules_arguments, rules_from_args, validate_allocation
+from scoring import match_trace
+from batch_score import load_opponents, score_candidates
+from metrics import prometheus_text, timed
+from payoff import POOL_CSV
+
+HOST = "127.0.0.1"
+PORT = 8765
+# How long the first request of a batch waits for others to join it, and
+# the most strategies scored in one vectorized call
+BATCH_WINDOW_MS = 2.0
+MAX_BATCH = 256
+MAX_BODY = 64 * 1024
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+log = logging.getLogger(__name__)
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Collects score requests for up to `window` seconds (or `max_batch`
+# requests) and scores them together as one (k, castles) x (pool, castles) call.
+# Scoring runs in a thread so requests keep queueing meanwhile; under load
+# the next batch is whatever arrived while the previous one was scored.
+class MicroBatcher:
+    def __init__(self, opponents, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH):
+        self.opponents = opponents
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.largest = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def score(self, strategy):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((strategy, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            strategies = [strategy for strategy, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self._score, strategies)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                # The client may have gone away while we were scoring
+                if not future.done():
+                    future.set_result(result)
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest = max(self.largest, len(batch))
+
+    def _score(self, strategies):
+        with timed("service.score_batch"):
+            by_type, mean_margin = score_candidates(strategies, self.opponents)
+        return [(by_type[k], float(mean_margin[k])) for k in range(len(strategies))]
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": round(self.requests / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest,
+        }
+
+
+def _strategy(payload, key, rules):
+    values = payload.get(key)
+    if not isinstance(values, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        raise RequestError(400, f"'{key}' must be a list of integers")
+    error = validate_allocation(values, rules)
+    if error:
+        raise RequestError(400, f"'{key}' {error}")
+    return np.array(values)
+
+
+# Method, path, HTTP version and body length from the request line and headers
+def _request_head(request_line, headers):
+    try:
+        method, path, version = request_line.decode("latin-1").split()
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise RequestError(400, "malformed request")
+    if length < 0:
+        raise RequestError(400, "malformed request")
+    if length > MAX_BODY:
+        raise RequestError(413, f"body larger than {MAX_BODY} bytes")
+    return method, path, version, length
+
+
+class ScoringService:
+    def __init__(self, pool_path=POOL_CSV, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH, rules=DEFAULT_RULES):
+        started = time.perf_counter()
+        self.rules = rules
+        self.opponents = load_opponents(pool_path, rules)
+        self.load_seconds = time.perf_counter() - started
+        self.batcher = MicroBatcher(self.opponents, window, max_batch)
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/score"): self.score,
+            ("POST", "/match"): self.match,
+        }
+
+    async def health(self, payload):
+        return {
+            "status": "ok",
+            "rules": self.rules.key,
+            "pool_size": int(self.opponents["counts"].sum()),
+            "distinct": len(self.opponents["unique"]),
+            "load_seconds": round(self.load_seconds, 3),
+            **self.batcher.stats(),
+        }
+
+    async def metrics(self, payload):
+        return prometheus_text()
+
+    # {"strategy": [one int per castle], "by_type": false} -> wins/draws/losses against
+    # the pool, as in Practice Mode
+    async def score(self, payload):
+        strategy = _strategy(payload, "strategy", self.rules)
+        by_type, mean_margin = await self.batcher.score(strategy)
+        wins, draws, losses = (int(v) for v in by_type.sum(axis=0))
+        total = wins + draws + losses
+        result = {
+            "wins": wins,
+            "draws": draws,
+            "losses": losses,
+            "total": total,
+            "win_rate": round(wins / total, 6),
+            "mean_margin": round(mean_margin, 4),
+        }
+        if payload.get("by_type"):
+            result["by_type"] = {
+                t: {"wins": int(w), "draws": int(d), "losses": int(l)}
+                for t, (w, d, l) in zip(self.opponents["type_names"], by_type)
+            }
+        return result
+
+    # {"s1": [...], "s2": [...], "p1": "You", "p2": "Them"} -> the castle by
+    # castle trace the match replay animates
+    async def match(self, payload):
+        s1, s2 = _strategy(payload, "s1", self.rules), _strategy(payload, "s2", self.rules)
+        trace = match_trace(s1, s2, self.rules)
+        trace["players"] = [str(payload.get("p1", "Player 1")), str(payload.get("p2", "Player 2"))]
+        return trace
+
+    async def handle(self, method, path, body):
+        route = self.routes.get((method, path.split("?")[0]))
+        if route is None:
+            if any(p == path.split("?")[0] for _, p in self.routes):
+                raise RequestError(405, f"{method} not allowed on {path}")
+            raise RequestError(404, f"no route for {path}")
+        payload = {}
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise RequestError(400, "body is not valid JSON")
+            if not isinstance(payload, dict):
+                raise RequestError(400, "body must be a JSON object")
+        return await route(payload)
+
+    # Minimal HTTP/1.1 with keep-alive: one request at a time per connection,
+    # bodies sized by Content-Length
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                # Unread or unparseable input leaves the stream out of step,
+                # so those errors also close the connection
+                version, in_step = "HTTP/1.0", False
+                try:
+                    method, path, version, length = _request_head(request_line, headers)
+                    body = await reader.readexactly(length) if length else b""
+                    in_step = True
+                    status, result = 200, await self.handle(method, path, body)
+                except RequestError as e:
+                    status, result = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception:
+                    # A bug in one handler answers that request, not the server
+                    log.exception("Error handling %s", request_line.decode("latin-1").strip())
+                    status, result = 500, {"error": "internal server error"}
+                keep_alive = in_step and version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._respond(writer, status, result, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, status, result, keep_alive):
+        if isinstance(result, str):
+            body, content_type = result.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(result).encode("utf-8"), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+async def serve(host=HOST, port=PORT, pool_path=POOL_CSV, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH,
+                rules=DEFAULT_RULES):
+    service = ScoringService(pool_path, window, max_batch, rules)
+    service.batcher.start()
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    print(f"Scoring {len(service.opponents['unique']):,} distinct pool strategies on http://{host}:{port} "
+          f"(pool loaded in {service.load_seconds:.1f}s)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve pool scoring and match replays over HTTP/JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--pool", default=POOL_CSV, help="strategy pool CSV")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="how long a request waits for others to batch with")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="most strategies scored per call")
+    add_rules_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool, args.window_ms / 1000, args.max_batch,
+                          rules_from_args(args)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from rules import DEFAULT_RULES, add_rules_arguments, rules_from_args
+from round_robin import pair_scores
+
+# Largest field the exhaustive pairing search runs on; it is exponential in
+# the worst case
+EXACT_PAIRING_LIMIT = 16
+
+
+def swiss_rounds(num_players):
+    return max(1, math.ceil(math.log2(max(num_players, 2))))
+
+
+# Pairs everyone in `order` (best standing first) with the nearest player
+# below them they haven't met yet. Players whose scan runs off the end are
+# returned unpaired.
+def _pair_greedy(order, opponents):
+    paired = [False] * len(order)
+    pairs, leftover = [], []
+    for a in range(len(order)):
+        if paired[a]:
+            continue
+        i = order[a]
+        for b in range(a + 1, len(order)):
+            if not paired[b] and order[b] not in opponents[i]:
+                paired[a] = paired[b] = True
+                pairs.append((i, order[b]))
+                break
+        else:
+            leftover.append(i)
+    return pairs, leftover
+
+
+# Fits the leftovers back in by pairing them with each other or splitting
+# the lowest-ranked pair that lets two of them both play a new opponent
+def _repair(pairs, leftover, opponents):
+    leftover = list(leftover)
+    while leftover:
+        u = leftover.pop()
+        v = next((v for v in leftover if v not in opponents[u]), None)
+        if v is not None:
+            leftover.remove(v)
+            pairs.append((u, v))
+            continue
+        for k in range(len(pairs) - 1, -1, -1):
+            a, b = pairs[k]
+            match = next(
+                ((x, y, v) for v in leftover for x, y in ((a, b), (b, a))
+                 if x not in opponents[u] and y not in opponents[v]),
+                None
+            )
+            if match is not None:
+                x, y, v = match
+                leftover.remove(v)
+                pairs[k] = (u, x)
+                pairs.append((v, y))
+                break
+        else:
+            return None
+    return pairs
+
+
+# Exhaustive search in standing order, for the rare late rounds of small
+# tournaments where the greedy pass and repairs can't avoid a rematch
+def _pair_exact(order, opponents):
+    if not order:
+        return []
+    i, rest = order[0], order[1:]
+    for k, j in enumerate(rest):
+        if j in opponents[i]:
+            continue
+        pairs = _pair_exact(rest[:k] + rest[k + 1:], opponents)
+        if pairs is not None:
+            return [(i, j)] + pairs
+    return None
+
+
+# Next round's pairings for players ranked by wins, then total points, then
+# at random. With an odd count the lowest-ranked player without a bye sits
+# out. Players are paired with the closest-ranked opponent they haven't met:
+# one scan down the standings (a few set lookups per player, so 10,000
+# players pair in tens of milliseconds) plus local repairs near the bottom.
+# When those fail, small fields are searched exhaustively and larger ones
+# pair the players left over from the scan in standing order, rematches
+# included. Returns an (n, 2) array of player indices and the bye (or None).
+def pair_round(wins, points, opponents, had_bye, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    num_players = len(wins)
+    order = np.lexsort((rng.random(num_players), -np.asarray(points), -np.asarray(wins))).tolist()
+    bye = None
+    if num_players % 2:
+        bye = next((i for i in reversed(order) if not had_bye[i]), order[-1])
+        order.remove(bye)
+
+    pairs, leftover = _pair_greedy(order, opponents)
+    if leftover:
+        pairs = _repair(pairs, leftover, opponents)
+    if pairs is None and len(order) <= EXACT_PAIRING_LIMIT:
+        pairs = _pair_exact(order, opponents)
+    elif pairs is None:
+        pairs, leftover = _pair_greedy(order, opponents)
+        pairs += zip(leftover[::2], leftover[1::2])
+    if pairs is None:
+        raise ValueError("Every remaining pairing would be a rematch.")
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2), bye
+
+
+# Swiss standings and history from recorded match dicts (those carrying a
+# "Swiss" round number); a bye counts as a win
+def swiss_history(names, matches):
+    index = {p: k for k, p in enumerate(names)}
+    wins = np.zeros(len(names), dtype=np.int64)
+    points = np.zeros(len(names), dtype=np.float64)
+    opponents = [set() for _ in names]
+    had_bye = np.zeros(len(names), dtype=bool)
+    rounds = 0
+    for m in matches:
+        if "Swiss" not in m or m["Player 1"] not in index:
+            continue
+        rounds = max(rounds, m["Swiss"])
+        i = index[m["Player 1"]]
+        if m.get("Bye"):
+            wins[i] += 1
+            had_bye[i] = True
+            continue
+        if m["Player 2"] not in index:
+            continue
+        j = index[m["Player 2"]]
+        opponents[i].add(j)
+        opponents[j].add(i)
+        points[i] += m["Score 1"]
+        points[j] += m["Score 2"]
+        wins[i] += m["Score 1"] > m["Score 2"]
+        wins[j] += m["Score 2"] > m["Score 1"]
+    return wins, points, opponents, had_bye, rounds
+
+
+# Plays a whole Swiss tournament headlessly: `strategies` is (players,
+# strategies per player, castles); with several strategies per player a match is
+# the expected result over all pairings, as in Round 2
+def simulate_swiss(strategies, rounds=None, seed=None, rules=DEFAULT_RULES):
+    rng = np.random.default_rng(seed)
+    num_players = len(strategies)
+    rounds = swiss_rounds(num_players) if rounds is None else rounds
+    wins = np.zeros(num_players, dtype=np.int64)
+    points = np.zeros(num_players, dtype=np.float64)
+    opponents = [set() for _ in range(num_players)]
+    had_bye = np.zeros(num_players, dtype=bool)
+    history = []
+    for r in range(1, rounds + 1):
+        started = time.perf_counter()
+        pairs, bye = pair_round(wins, points, opponents, had_bye, rng)
+        paired = time.perf_counter()
+        you, them = pair_scores(strategies, pairs, rules)
+        s1, s2 = you.mean(axis=(1, 2)), them.mean(axis=(1, 2))
+        i, j = pairs[:, 0], pairs[:, 1]
+        points[i] += s1
+        points[j] += s2
+        wins[i] += s1 > s2
+        wins[j] += s2 > s1
+        for a, b in pairs.tolist():
+            opponents[a].add(b)
+            opponents[b].add(a)
+        if bye is not None:
+            wins[bye] += 1
+            had_bye[bye] = True
+        history.append({
+            "round": r,
+            "pairs": len(pairs),
+            "bye": bye,
+            "pair_seconds": paired - started,
+            "play_seconds": time.perf_counter() - paired,
+            "leader_wins": int(wins.max()),
+            "undefeated": int(np.count_nonzero(wins == r)),
+        })
+    return {"wins": wins, "points": points, "opponents": opponents, "had_bye": had_bye, "history": history}
+
+
+def main():
+    from pool_bundle import load_pool
+    from payoff import POOL_CSV
+
+    parser = argparse.ArgumentParser(description="Simulate a Swiss tournament of strategies drawn from the pool.")
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--strategies", type=int, default=1, help="strategies per player (3 for Round 2)")
+    parser.add_argument("--rounds", type=int, default=None, help="default: ceil(log2(players))")
+    parser.add_argument("--pool", default=POOL_CSV, help="strategy pool CSV")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10, help="final standings to print")
+    add_rules_arguments(parser)
+    args = parser.parse_args()
+
+    strat_array, names, _, _ = load_pool(args.pool)
+    rng = np.random.default_rng(args.seed)
+    picks = rng.integers(len(strat_array), size=(args.players, args.strategies))
+    result = simulate_swiss(strat_array[picks], args.rounds, args.seed, rules_from_args(args))
+
+    for h in result["history"]:
+        print(f"Round {h['round']:>2}: {h['pairs']:,} matches, paired in {h['pair_seconds'] * 1e3:.1f} ms, "
+              f"played in {h['play_seconds'] * 1e3:.1f} ms; {h['undefeated']} undefeated")
+    rounds = len(result["history"])
+    met = sum(len(o) for o in result["opponents"])
+    expected = args.players * rounds - int(result["had_bye"].sum())
+    byes = sum(h["bye"] is not None for h in result["history"])
+    print(f"{met // 2:,} matches, {'no' if met == expected else 'SOME'} rematches, "
+          f"{byes} byes to {int(result['had_bye'].sum())} different players")
+    order = np.lexsort((-result["points"], -result["wins"]))[:args.top]
+    for rank, i in enumerate(order, 1):
+        label = " / ".join(names[picks[i]])
+        print(f"{rank:>3}. wins={result['wins'][i]}  points={result['points'][i]:.1f}  {label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,220 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from match_utils import play_full_match, NUM_CASTLES
-from collections import defaultdict
-
-def tournament_mode():
+from match_utils import play_full_match
+from rules import DEFAULT_RULES, validate_allocation
+from round_robin import score_round_robin, score_pairs
+from swiss import pair_round, swiss_history, swiss_rounds
+from charts import outcome_heatmap
+from metrics import timed
+from tournament_store import TournamentStore, DEFAULT_TOURNAMENT
+
+# Each session keeps its own connection and copy of the state; opening a
+# tournament restores it from the latest snapshot, and every rerun picks up
+# what other sessions (the organiser, other screens) have recorded since
+def get_store(tournament, rules=DEFAULT_RULES):
+    store = st.session_state.get("tournament_store")
+    if store is None or store.tournament != tournament or store.rules != rules:
+        with timed("tournament.restore"):
+            store = st.session_state.tournament_store = TournamentStore(tournament, rules=rules)
+    return store
+
+def tournament_mode(rules=DEFAULT_RULES):
     if 'round' not in st.session_state:
         st.session_state.round = 1
-    if 'players' not in st.session_state:
-        st.session_state.players = {}
-    if 'results_r1' not in st.session_state:
-        st.session_state.results_r1 = []
-    if 'results_r2' not in st.session_state:
-        st.session_state.results_r2 = []
 
     st.title("🏆 Blotto Tournament")
+    st.caption(f"Rules: {rules.describe()}.")
 
     # Sidebar
+    tournament = st.sidebar.text_input("Tournament", value=DEFAULT_TOURNAMENT, key="tournament_name").strip() or DEFAULT_TOURNAMENT
+    store = get_store(tournament, rules)
+    with timed("tournament.refresh"):
+        state = store.refresh()
+    # A tournament keeps the rules it started with, so scores stay comparable
+    if state.rules_key not in (None, rules.key):
+        st.error(
+            f"Tournament '{tournament}' is played under different rules ({state.rules_description}). "
+            f"Select them under Game rules in the sidebar, or start a new tournament."
+        )
+        return
     if st.sidebar.button("Switch to Round 2"):
         st.session_state.round = 2
     st.sidebar.write(f"**Current Round:** {st.session_state.round}")
+    st.sidebar.button("🔄 Refresh")
+    stats = store.stats()
+    st.sidebar.caption(
+        f"Event log at #{stats['last_event']}; restored from the snapshot at #{stats['restored_from']} "
+        f"+ {stats['replayed']} events in {stats['restore_ms']:.0f} ms."
+    )
+    current_round = st.session_state.round
 
     # Add player
     st.header("Add Player")
     with st.form("add_player_form"):
         name = st.text_input("Player name")
         num_strat = 1 if st.session_state.round == 1 else 3
-        strategy_inputs = [st.text_input(f"Strategy {i+1} (comma-separated 10 numbers)", key=f"strat_input_{i}") for i in range(num_strat)]
+        strategy_inputs = [
+            st.text_input(f"Strategy {i+1} (comma-separated {rules.num_castles} numbers)", key=f"strat_input_{i}")
+            for i in range(num_strat)
+        ]
         submitted = st.form_submit_button("Add Player")
         if submitted:
             strategies = []
             for idx, s in enumerate(strategy_inputs):
                 try:
                     vec = list(map(int, s.split(',')))
-                    assert len(vec) == 10 and sum(vec) == 100 and all(x >= 0 for x in vec)
-                    strategies.append(vec)
-                except:
-                    st.error(f"Strategy {idx+1} must be 10 non-negative integers summing to 100.")
+                except ValueError:
+                    vec = None
+                error = "must be comma-separated integers" if vec is None else validate_allocation(vec, rules)
+                if error:
+                    st.error(f"Strategy {idx+1}: {error}.")
                     break
+                strategies.append(vec)
             else:
-                st.session_state.players[name] = strategies
+                store.add_player(name, strategies)
                 st.success(f"Added {name} with {num_strat} strategy(ies).")
 
     # Show players
     st.header("Current Players")
-    for p, s in st.session_state.players.items():
+    for p, s in state.players.items():
         st.write(f"**{p}**: {len(s)} strategy(ies)")
 
     # Match play
     st.header("Play Match")
-    players = list(st.session_state.players.keys())
+    players = list(state.players.keys())
     if len(players) >= 2:
         p1 = st.selectbox("Player 1", players, key="p1_select")
         p2 = st.selectbox("Player 2", [p for p in players if p != p1], key="p2_select")
         if st.session_state.round == 1:
-            s1, s2 = st.session_state.players[p1][0], st.session_state.players[p2][0]
+            s1, s2 = state.players[p1][0], state.players[p2][0]
         else:
             strat1 = st.selectbox(f"Select strategy for {p1}", [1, 2, 3])
             strat2 = st.selectbox(f"Select strategy for {p2}", [1, 2, 3])
-            s1 = st.session_state.players[p1][strat1 - 1]
-            s2 = st.session_state.players[p2][strat2 - 1]
+            s1 = state.players[p1][strat1 - 1]
+            s2 = state.players[p2][strat2 - 1]
         if st.button("Start Match"):
-            score1, score2 = play_full_match(s1, s2, p1, p2)
+            score1, score2 = play_full_match(s1, s2, p1, p2, rules=rules)
             match = {"Player 1": p1, "Player 2": p2, "Score 1": score1, "Score 2": score2}
-            if st.session_state.round == 1:
-                st.session_state.results_r1.append(match)
-            else:
-                st.session_state.results_r2.append(match)
+            store.record_match(current_round, match)
+
+    # Headless round robin
+    st.header("⚡ Run All Matches")
+    num_strat = 1 if st.session_state.round == 1 else 3
+    st.markdown(
+        "Score every pair of players at once, without animation."
+        if num_strat == 1 else
+        "Score all 3 × 3 strategy pairings for every pair of players; the recorded score is the expected result."
+    )
+    if st.button("⚡ Run all matches"):
+        with timed("tournament.round_robin"):
+            matches = score_round_robin(state.players, num_strat, rules)
+        # A new run replaces the previous automatic results but keeps hand-played matches
+        store.replace_matches(current_round, lambda m: m.get("Auto"), matches)
+        skipped = [p for p, s in state.players.items() if len(s) < num_strat]
+        st.success(f"Played {len(matches)} matches.")
+        if skipped:
+            st.warning(f"Skipped players without {num_strat} strategies: {', '.join(skipped)}")
+
+    # Swiss rounds
+    st.header("🇨🇭 Swiss Rounds")
+    entrants = [p for p, s in state.players.items() if len(s) >= num_strat]
+    swiss_wins, swiss_points, opponents, had_bye, swiss_played = swiss_history(entrants, state.results[current_round].values())
+    st.markdown(
+        f"Each round pairs players with similar records who haven't met yet; an odd player out gets a bye "
+        f"(a win). {len(entrants)} players need about {swiss_rounds(len(entrants))} rounds, "
+        f"{swiss_played} played so far."
+    )
+    if len(entrants) >= 2 and st.button("🇨🇭 Play next Swiss round"):
+        try:
+            with timed("tournament.swiss_pairing"):
+                pairs, bye = pair_round(swiss_wins, swiss_points, opponents, had_bye)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            with timed("tournament.swiss_round"):
+                matches = score_pairs(
+                    state.players, [(entrants[i], entrants[j]) for i, j in pairs.tolist()], num_strat, rules
+                )
+            matches = [dict(m, Swiss=swiss_played + 1) for m in matches]
+            if bye is not None:
+                matches.append({
+                    "Player 1": entrants[bye], "Player 2": None, "Score 1": 0, "Score 2": 0,
+                    "Bye": True, "Swiss": swiss_played + 1
+                })
+            store.record_matches(current_round, matches)
+            st.success(
+                f"Swiss round {swiss_played + 1}: {len(pairs)} matches"
+                + (f", bye for {entrants[bye]}." if bye is not None else ".")
+            )
+
+    auto_matches = [m for m in state.results[current_round].values() if "Pairings" in m]
+    if auto_matches:
+        with st.expander("🎬 Replay a match"):
+            chosen = st.selectbox(
+                "Match", range(len(auto_matches)),
+                format_func=lambda k: f"{auto_matches[k]['Player 1']} vs {auto_matches[k]['Player 2']}"
+            )
+            match = auto_matches[chosen]
+            pairing = match["Pairings"][0]
+            if len(match["Pairings"]) > 1:
+                pairing = st.selectbox(
+                    "Pairing", match["Pairings"],
+                    index=match["Pairings"].index(match["Best"]),
+                    format_func=lambda r: f"Strategy {r['Strategy 1']} vs Strategy {r['Strategy 2']} ({r['Score 1']}–{r['Score 2']})"
+                )
+            if st.button("▶️ Replay"):
+                p1, p2 = match["Player 1"], match["Player 2"]
+                play_full_match(
+                    state.players[p1][pairing["Strategy 1"] - 1],
+                    state.players[p2][pairing["Strategy 2"] - 1],
+                    p1, p2, rules=rules
+                )
 
     # Match history and scoreboard
-    results = st.session_state.results_r1 if st.session_state.round == 1 else st.session_state.results_r2
+    results = list(state.results[current_round].values())
     st.header("📊 Scoreboard")
 
-    win_counts = defaultdict(int)
-    total_points = defaultdict(int)
-    for match in results:
-        p1, p2 = match["Player 1"], match["Player 2"]
-        s1, s2 = match["Score 1"], match["Score 2"]
-        total_points[p1] += s1
-        total_points[p2] += s2
-        if s1 > s2:
-            win_counts[p1] += 1
-        elif s2 > s1:
-            win_counts[p2] += 1
-
-    all_players = list(st.session_state.players.keys())
+    board = state.scoreboards[current_round]
+    all_players = list(state.players.keys())
     if all_players:
-        scoreboard = pd.DataFrame([{
-            "Player": p,
-            "Wins": win_counts[p],
-            "Total Score": total_points[p]
-        } for p in all_players]).sort_values(by="Wins", ascending=False)
+        with timed("tournament.scoreboard_table"):
+            wins, points = board.totals(all_players)
+            scoreboard = pd.DataFrame({
+                "Player": all_players,
+                "Wins": wins,
+                "Total Score": points.round(2)
+            }).sort_values(by="Wins", ascending=False)
         st.dataframe(scoreboard, use_container_width=True)
 
-        # Head-to-head visual
-        import matplotlib.pyplot as plt
-        import matplotlib.colors as mcolors
-        import seaborn as sns
-
         # Head-to-head visual
         st.subheader("🟢 Head-to-Head Outcomes 🔴")
-
-        outcome_matrix = np.full((len(all_players), len(all_players)), np.nan)
-
-        for i, pi in enumerate(all_players):
-            for j, pj in enumerate(all_players):
-                if pi == pj:
-                    continue
-                wins = any(
-                    (m["Player 1"] == pi and m["Player 2"] == pj and m["Score 1"] > m["Score 2"]) or
-                    (m["Player 2"] == pi and m["Player 1"] == pj and m["Score 2"] > m["Score 1"])
-                    for m in results
-                )
-                losses = any(
-                    (m["Player 1"] == pi and m["Player 2"] == pj and m["Score 1"] < m["Score 2"]) or
-                    (m["Player 2"] == pi and m["Player 1"] == pj and m["Score 2"] < m["Score 1"])
-                    for m in results
-                )
-                if wins:
-                    outcome_matrix[i][j] = 1
-                elif losses:
-                    outcome_matrix[i][j] = -1
-                else:
-                    outcome_matrix[i][j] = 0
-
-        cmap = mcolors.ListedColormap(["#ff9999", "white", "#99ff99"])  # red, white, green
-        bounds = [-1.5, -0.5, 0.5, 1.5]
-        norm = mcolors.BoundaryNorm(bounds, cmap.N)
-
-        fig, ax = plt.subplots(figsize=(6, 6))
-        sns.heatmap(
-            outcome_matrix,
-            cmap=cmap,
-            norm=norm,
-            cbar=False,
-            xticklabels=all_players,
-            yticklabels=all_players,
-            linewidths=0.5,
-            linecolor='gray',
-            square=True,
-            annot=False,
-            ax=ax
-        )
-        ax.set_xlabel("Opponent")
-        ax.set_ylabel("Player")
-        st.pyplot(fig)
+        with timed("tournament.heatmap"):
+            heatmap = outcome_heatmap(board.outcome_matrix(all_players), all_players)
+        if isinstance(heatmap, bytes):
+            st.image(heatmap)
+        else:
+            st.image(heatmap, caption="Rows and columns follow the player list order.")
 
     else:
         st.info("Scoreboard will appear here once players have been added and matches played.")
 
     # Match history with delete buttons
     st.header("🕹 Match History")
-    for i, match in enumerate(results):
+    for match in results:
         col1, col2 = st.columns([8, 1])
         with col1:
-            st.markdown(f"- **{match['Player 1']}** ({match['Score 1']}) vs **{match['Player 2']}** ({match['Score 2']})")
+            if match.get("Bye"):
+                st.markdown(f"- **{match['Player 1']}** has a bye (Swiss round {match['Swiss']})")
+            else:
+                st.markdown(f"- **{match['Player 1']}** ({match['Score 1']}) vs **{match['Player 2']}** ({match['Score 2']})")
+            if "Best" in match:
+                best, worst = match["Best"], match["Worst"]
+                st.caption(
+                    f"Expected over all pairings. Best for {match['Player 1']}: strategy {best['Strategy 1']} vs "
+                    f"{best['Strategy 2']} ({best['Score 1']}–{best['Score 2']}); worst: strategy "
+                    f"{worst['Strategy 1']} vs {worst['Strategy 2']} ({worst['Score 1']}–{worst['Score 2']})"
+                )
         with col2:
-            if st.button("🗑️", key=f"delete_{st.session_state.round}_{i}"):
-                (st.session_state.results_r1 if st.session_state.round == 1 else st.session_state.results_r2).pop(i)
-                st.experimental_rerun()
+            if st.button("🗑️", key=f"delete_{current_round}_{match['id']}"):
+                store.delete_match(current_round, match["id"])
+                st.rerun()
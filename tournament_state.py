@@ -0,0 +1,82 @@
+import numpy as np
+
+
+# Running totals for one round, indexed by player: wins and points per player
+# and how often each player beat each other player. Matches are added and
+# removed in O(1) each, so the scoreboard and head-to-head matrix never have
+# to be rebuilt from the full results list.
+class Scoreboard:
+    def __init__(self, capacity=16):
+        self.index = {}
+        self.names = []
+        self.num_matches = 0
+        self.wins = np.zeros(capacity, dtype=np.int64)
+        self.points = np.zeros(capacity, dtype=np.float64)
+        self.beat = np.zeros((capacity, capacity), dtype=np.int64)
+
+    def _grow(self, needed):
+        capacity = len(self.wins)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.wins = np.resize(self.wins, capacity)
+        self.wins[len(self.names):] = 0
+        self.points = np.resize(self.points, capacity)
+        self.points[len(self.names):] = 0
+        beat = np.zeros((capacity, capacity), dtype=np.int64)
+        beat[:len(self.names), :len(self.names)] = self.beat[:len(self.names), :len(self.names)]
+        self.beat = beat
+
+    def player_index(self, name):
+        if name not in self.index:
+            self._grow(len(self.names) + 1)
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        return self.index[name]
+
+    def _apply(self, matches, sign):
+        self.num_matches += sign * len(matches)
+        # A Swiss bye is a win with no points and no opponent
+        byes = [m for m in matches if "Bye" in m]
+        if byes:
+            np.add.at(self.wins, [self.player_index(m["Player 1"]) for m in byes], sign)
+            matches = [m for m in matches if "Bye" not in m]
+        if not matches:
+            return
+        i = np.array([self.player_index(m["Player 1"]) for m in matches])
+        j = np.array([self.player_index(m["Player 2"]) for m in matches])
+        s1 = np.array([m["Score 1"] for m in matches], dtype=np.float64)
+        s2 = np.array([m["Score 2"] for m in matches], dtype=np.float64)
+        np.add.at(self.points, i, sign * s1)
+        np.add.at(self.points, j, sign * s2)
+        winner = np.where(s1 > s2, i, j)[s1 != s2]
+        loser = np.where(s1 > s2, j, i)[s1 != s2]
+        np.add.at(self.wins, winner, sign)
+        np.add.at(self.beat, (winner, loser), sign)
+
+    def add_matches(self, matches):
+        self._apply(matches, 1)
+
+    def remove_matches(self, matches):
+        self._apply(matches, -1)
+
+    def add_match(self, match):
+        self._apply([match], 1)
+
+    def remove_match(self, match):
+        self._apply([match], -1)
+
+    def totals(self, names):
+        idx = [self.player_index(p) for p in names]
+        return self.wins[idx], self.points[idx]
+
+    # 1 if the row player beat the column player at least once, otherwise -1
+    # if they lost to them, otherwise 0; the diagonal is NaN
+    def outcome_matrix(self, names):
+        idx = [self.player_index(p) for p in names]
+        beat = self.beat[np.ix_(idx, idx)]
+        outcome = np.where(beat > 0, 1.0, np.where(beat.T > 0, -1.0, 0.0))
+        np.fill_diagonal(outcome, np.nan)
+        return outcome
+
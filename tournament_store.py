@@ -0,0 +1,212 @@
+import json
+import sqlite3
+import threading
+import time
+
+from rules import DEFAULT_RULES
+from tournament_state import Scoreboard
+
+TOURNAMENT_DB = "tournament.sqlite"
+DEFAULT_TOURNAMENT = "default"
+ROUNDS = (1, 2)
+# Events between snapshots, so a restore never replays more than this many
+SNAPSHOT_EVERY = 500
+SNAPSHOTS_KEPT = 2
+# Bumped whenever the snapshot format changes; older snapshots are ignored
+# and the log is replayed instead
+SNAPSHOT_VERSION = 3
+
+
+# Everything the tournament page shows, folded from the event log: the
+# ruleset it is played under, players and their strategies, each round's
+# matches keyed by the id (sequence number) of the event that recorded them,
+# and each round's scoreboard
+class TournamentState:
+    def __init__(self):
+        self.seq = 0
+        self.rules_key = None
+        self.rules_description = None
+        self.players = {}
+        self.results = {r: {} for r in ROUNDS}
+        self.scoreboards = {r: Scoreboard() for r in ROUNDS}
+
+    def apply(self, seq, kind, data):
+        if self.rules_key is None:
+            # Logs from before rulesets were recorded are standard games
+            rules = data if kind == "rules_set" else {"key": DEFAULT_RULES.key, "description": DEFAULT_RULES.describe()}
+            self.rules_key, self.rules_description = rules["key"], rules["description"]
+        if kind == "player_added":
+            self.players[data["name"]] = data["strategies"]
+        elif kind == "match_played":
+            match = dict(data["match"], id=seq)
+            self.results[data["round"]][seq] = match
+            self.scoreboards[data["round"]].add_match(match)
+        elif kind == "match_deleted":
+            # Another session may have deleted it already
+            match = self.results[data["round"]].pop(data["match_id"], None)
+            if match is not None:
+                self.scoreboards[data["round"]].remove_match(match)
+        self.seq = seq
+
+    # Snapshots hold plain JSON: the players and every round's matches. The
+    # scoreboards are rebuilt from the matches on load.
+    def to_json(self):
+        return json.dumps({
+            "seq": self.seq,
+            "rules": {"key": self.rules_key, "description": self.rules_description},
+            "players": self.players,
+            "results": {str(r): list(matches.values()) for r, matches in self.results.items()},
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        state = cls()
+        state.seq = data["seq"]
+        state.rules_key, state.rules_description = data["rules"]["key"], data["rules"]["description"]
+        state.players = data["players"]
+        for r in ROUNDS:
+            matches = data["results"].get(str(r), [])
+            state.results[r] = {m["id"]: m for m in matches}
+            state.scoreboards[r].add_matches(matches)
+        return state
+
+
+# One tournament's append-only event log in SQLite (WAL, so any number of
+# sessions and processes can read while one writes). The state is restored
+# from the latest snapshot plus the events after it, and every refresh
+# applies only the events other sessions appended since the last one. The
+# first event records `rules`; writes under a different ruleset are refused.
+class TournamentStore:
+    def __init__(self, tournament=DEFAULT_TOURNAMENT, path=TOURNAMENT_DB, snapshot_every=SNAPSHOT_EVERY,
+                 rules=DEFAULT_RULES):
+        self.tournament = tournament
+        self.rules = rules
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, tournament TEXT NOT NULL, kind TEXT NOT NULL, "
+            "data TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_by_tournament ON events (tournament, seq)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "tournament TEXT NOT NULL, seq INTEGER NOT NULL, version INTEGER NOT NULL, state TEXT NOT NULL, "
+            "PRIMARY KEY (tournament, seq))"
+        )
+        self._db.commit()
+
+        started = time.perf_counter()
+        row = self._db.execute(
+            "SELECT state FROM snapshots WHERE tournament = ? AND version = ? ORDER BY seq DESC LIMIT 1",
+            (tournament, SNAPSHOT_VERSION)
+        ).fetchone()
+        self.state = TournamentState()
+        if row:
+            # A damaged or unreadable snapshot only costs a full replay
+            try:
+                self.state = TournamentState.from_json(row[0])
+            except (ValueError, KeyError, TypeError):
+                self.state = TournamentState()
+        self.snapshot_seq = self.state.seq
+        self.restored_from = self.state.seq
+        self.replayed = self._catch_up()
+        self.restore_seconds = time.perf_counter() - started
+        self._maybe_snapshot()
+
+    def _catch_up(self):
+        rows = self._db.execute(
+            "SELECT seq, kind, data FROM events WHERE tournament = ? AND seq > ? ORDER BY seq",
+            (self.tournament, self.state.seq)
+        ).fetchall()
+        for seq, kind, data in rows:
+            self.state.apply(seq, kind, json.loads(data))
+        return len(rows)
+
+    def _maybe_snapshot(self):
+        if self.state.seq - self.snapshot_seq < self.snapshot_every:
+            return
+        blob = self.state.to_json()
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots (tournament, seq, version, state) VALUES (?, ?, ?, ?)",
+                (self.tournament, self.state.seq, SNAPSHOT_VERSION, blob)
+            )
+            self._db.execute(
+                "DELETE FROM snapshots WHERE tournament = ? AND seq NOT IN ("
+                "SELECT seq FROM snapshots WHERE tournament = ? ORDER BY seq DESC LIMIT ?)",
+                (self.tournament, self.tournament, SNAPSHOTS_KEPT)
+            )
+        self.snapshot_seq = self.state.seq
+
+    # Appends the events in one transaction and brings the state up to date,
+    # including anything other sessions wrote in the meantime. `events` may be
+    # a function of the current state: it is called after taking SQLite's
+    # write lock and catching up, so no other session or process can append
+    # between reading the state and writing what was derived from it.
+    def _append(self, events):
+        now = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._catch_up()
+                if self.state.rules_key not in (None, self.rules.key):
+                    raise ValueError(
+                        f"Tournament {self.tournament!r} is played under other rules: {self.state.rules_description}."
+                    )
+                if callable(events):
+                    events = events(self.state)
+                if self.state.rules_key is None:
+                    events = [("rules_set", {"key": self.rules.key, "description": self.rules.describe()})] + events
+                self._db.executemany(
+                    "INSERT INTO events (tournament, kind, data, created) VALUES (?, ?, ?, ?)",
+                    [(self.tournament, kind, json.dumps(data), now) for kind, data in events]
+                )
+            self._catch_up()
+            self._maybe_snapshot()
+        return self.state
+
+    def refresh(self):
+        with self._lock:
+            self._catch_up()
+            self._maybe_snapshot()
+        return self.state
+
+    def add_player(self, name, strategies):
+        return self._append([("player_added", {"name": name, "strategies": strategies})])
+
+    def record_match(self, round, match):
+        return self.record_matches(round, [match])
+
+    def record_matches(self, round, matches):
+        return self._append([("match_played", {"round": round, "match": m}) for m in matches])
+
+    def delete_match(self, round, match_id):
+        return self._append([("match_deleted", {"round": round, "match_id": match_id})])
+
+    # Replaces every match of the round for which `drop(match)` is true with
+    # `matches`, as one transaction; concurrent replacements run one after
+    # the other, each dropping what the previous one recorded
+    def replace_matches(self, round, drop, matches):
+        return self._append(lambda state: (
+            [("match_deleted", {"round": round, "match_id": m["id"]})
+             for m in state.results[round].values() if drop(m)] +
+            [("match_played", {"round": round, "match": m}) for m in matches]
+        ))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "last_event": self.state.seq,
+                "restored_from": self.restored_from,
+                "replayed": self.replayed,
+                "restore_ms": self.restore_seconds * 1000,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()